@@ -1,5 +1,6 @@
 """Configuration and constants for the application."""
 import os
+import sys
 from pathlib import Path
 
 # Directories
@@ -21,20 +22,22 @@ SAMPLE_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-# SFX Library
-SFX_LIBRARY = {
-    "fear": ["heavy breathing", "distant scream", "heartbeat"],
-    "aggression": ["footsteps", "metal crash", "shouting"],
-    "isolation": ["echoes", "dripping water", "creaking floor"],
-    "neutral": ["soft wind", "low hum", "light static"],
-}
+# SFX Library (shared with the backend's pre-rendered library)
+sys.path.append(str(BASE_DIR.parent))
+from backend.services.sfx_library import CATALOG as SFX_LIBRARY  # noqa: E402
+from backend.services.storage_layout import ShardedLayout  # noqa: E402
+
+# Generated files are sharded by name hash; resolve them through the layout.
+OUTPUT_LAYOUT = ShardedLayout(OUTPUT_DIR)
 
 # Predefined horror prompts for SFX generation
-SFX_PROMPTS = [
-    "distant whisper",
-    "footsteps on old wood",
-    "metal door slam",
-    "wind howling through trees",
-    "low breathing",
-    "creaking floorboards",
-]
\ No newline at end of file
+SFX_PROMPTS = SFX_LIBRARY["horror"]
+
+# GPT-OSS prompt enrichment
+GPT_OSS_URL = os.getenv("GPT_OSS_URL", "http://localhost:11434")
+GPT_OSS_MODEL = os.getenv("GPT_OSS_MODEL", "gpt-oss")
+GPT_OSS_TIMEOUT = float(os.getenv("GPT_OSS_TIMEOUT", "10"))
+GPT_OSS_CACHE_SIZE = int(os.getenv("GPT_OSS_CACHE_SIZE", "512"))
+GPT_OSS_CACHE_TTL = float(os.getenv("GPT_OSS_CACHE_TTL", "3600"))
+GPT_OSS_BREAKER_THRESHOLD = int(os.getenv("GPT_OSS_BREAKER_THRESHOLD", "3"))
+GPT_OSS_BREAKER_COOLDOWN = float(os.getenv("GPT_OSS_BREAKER_COOLDOWN", "30"))
@@ -1,12 +1,14 @@
 """Streamlined main FastAPI application file."""
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 
 # Import configuration and setup
-from config import BASE_DIR, OUTPUT_DIR
+from config import BASE_DIR, OUTPUT_LAYOUT
+from backend.services.file_serving import file_response
 from services.job_processor import start_job_processor
+from utils.system import start_sampler
 from routes.health import router as health_router
 from routes.audio import router as audio_router
 
@@ -47,12 +49,13 @@ if os.path.exists(frontend_dir):
 else:
     print(f"[STARTUP] ⚠️ Frontend build not found at {frontend_dir}")
 
-# Serve generated audio files
-if OUTPUT_DIR.exists():
-    print(f"[STARTUP] Mounting generated audio from {OUTPUT_DIR} at /audio")
-    app.mount("/audio", StaticFiles(directory=str(OUTPUT_DIR)), name="audio")
-else:
-    print(f"[STARTUP] ⚠️ OUTPUT_DIR not found at {OUTPUT_DIR}")
+# Serve generated audio files (sharded on disk; URLs stay /audio/<filename>)
+@app.api_route("/audio/{filename}", methods=["GET", "HEAD"])
+def audio_file(filename: str, request: Request):
+    path = None if "/" in filename or filename.startswith(".") else OUTPUT_LAYOUT.resolve(filename)
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=404, detail="Not Found")
+    return file_response(request, path)
 
 # Include routers
 app.include_router(health_router)
@@ -65,8 +68,15 @@ app.include_router(router)
 @app.on_event("startup")
 def startup_event():
     """Initialize background services on startup."""
+    start_sampler()
     start_job_processor()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled outbound connections."""
+    from services.gpt_oss import get_client
+    await get_client().aclose()
+
 # Serve frontend for all unmatched routes (SPA support)
 @app.get("/{path:path}")
 async def serve_frontend(path: str):
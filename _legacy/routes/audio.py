@@ -2,21 +2,25 @@
 import os
 import time
 import uuid
-import datetime
+import logging
 import traceback
 import random
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse, JSONResponse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi.responses import JSONResponse
 from pydub import AudioSegment
 
 from models.schemas import GenerateAudioRequest
 from services.gpt_oss import query_gptoss
 from services.job_processor import job_queue, job_status, processing_lock
-from utils.logging import log_request, log, logger, log_fail
-from config import OUTPUT_DIR, UPLOAD_DIR, SFX_LIBRARY
+from utils.logging import log_request, log, logger, log_fail, log_event
+from config import OUTPUT_LAYOUT, UPLOAD_DIR, SFX_LIBRARY
+from backend.services.file_serving import file_response
+from backend.services.sfx_library import library as sfx_library
+from backend.services.storage_layout import layout as library_layout
 
 router = APIRouter(prefix="/api")
 
@@ -40,7 +44,7 @@ async def generate_audio(data: GenerateAudioRequest):
         log.info(f"[API] Generated filename: {filename}")
         
         # Enrich prompt with GPT-OSS (safe route handler call)
-        enriched_prompt = query_gptoss(f"Rewrite this music and SFX prompt to be more cinematic and expressive: {data.prompt}")
+        enriched_prompt = await query_gptoss(f"Rewrite this music and SFX prompt to be more cinematic and expressive: {data.prompt}")
         
         # Create job object and add to queue
         job = {
@@ -57,14 +61,7 @@ async def generate_audio(data: GenerateAudioRequest):
         
         log.info(f"[API] ✅ Job queued: {filename} (Queue size: {len(job_queue)})")
         
-        # Log the request
-        try:
-            from config import LOG_FILE
-            with open(LOG_FILE, "a") as logf:
-                timestamp = datetime.datetime.now().isoformat()
-                logf.write(f"[{timestamp}] REQUEST_QUEUED: {data.prompt} | {filename} | duration: {data.duration}\n")
-        except Exception as e:
-            log.warning(f"[API] Failed to write to log file: {e}")
+        log_event("REQUEST_QUEUED", filename, job_id=filename, prompt=data.prompt, duration=data.duration)
 
         log.info(f"[API] Returning queued response for {filename}")
         return JSONResponse(
@@ -82,17 +79,7 @@ async def generate_audio(data: GenerateAudioRequest):
         error_msg = f"Audio generation queueing failed: {str(e)}"
         full_trace = traceback.format_exc()
         log_fail("api_request", error_msg)
-        log.error(f"[API] {error_msg}\nFull traceback:\n{full_trace}")
-        
-        # Write to log file
-        try:
-            from config import LOG_FILE
-            with open(LOG_FILE, "a") as logf:
-                timestamp = datetime.datetime.now().isoformat()
-                logf.write(f"[{timestamp}] API_ERROR: {data.prompt} | Error: {str(e)}\n")
-                logf.write(f"Full traceback:\n{full_trace}\n")
-        except Exception:
-            pass  # Ignore log file errors in error handler
+        log_event("API_ERROR", error_msg, level=logging.ERROR, exc_info=e, prompt=data.prompt)
             
         return JSONResponse(
             status_code=500,
@@ -109,8 +96,8 @@ async def get_status(filename: str):
         raise HTTPException(status_code=404, detail="Job not found")
     
     status = job_status[filename]
-    file_path = OUTPUT_DIR / filename
-    file_exists = file_path.exists()
+    # Manifest lookup: no filesystem probe per status poll.
+    file_exists = OUTPUT_LAYOUT.exists(filename)
     
     # If file is done, check if it actually exists
     if status == "done":
@@ -126,22 +113,18 @@ async def get_status(filename: str):
     }
 
 @router.get("/download/{filename}")
-async def download_file(filename: str):
-    """Download generated audio file."""
-    file_path = OUTPUT_DIR / filename
+async def download_file(filename: str, request: Request):
+    """Download generated audio file (ETag, 304 and Range aware)."""
+    file_path = OUTPUT_LAYOUT.resolve(filename)
     
-    if not file_path.exists():
+    if file_path is None or not file_path.exists():
         # Check if it's still being processed
         if filename in job_status and job_status[filename] in ["queued", "running"]:
             raise HTTPException(status_code=202, detail="File is still being processed")
         else:
             raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(
-        path=str(file_path),
-        filename=filename,
-        media_type="audio/mpeg"
-    )
+    return file_response(request, file_path, download_name=filename)
 
 @router.post("/upload-video")
 async def upload_video(file: UploadFile = File(...)):
@@ -172,14 +155,19 @@ async def sfx_from_video(video_id: str):
     transcript = transcribe_video(str(path))
     
     # Use GPT-OSS for tone extraction and scene prompt generation
-    scene_prompt = query_gptoss(f"Based on this transcript, write a cinematic audio prompt that fits the mood:\n\n{transcript}")
+    scene_prompt = await query_gptoss(f"Based on this transcript, write a cinematic audio prompt that fits the mood:\n\n{transcript}")
     logger.info(f"[VIDEO-SFX] GPT-OSS generated scene prompt: {scene_prompt}")
     
     # Fallback to traditional tone analysis if GPT-OSS fails
     tone = analyze_tone(transcript)
     sfx_prompts = [scene_prompt] if scene_prompt != transcript else random.sample(SFX_LIBRARY[tone], 2)
 
-    clips = [generate_sfx_clip(p, 10) for p in sfx_prompts]
+    clips = []
+    for p in sfx_prompts:
+        # Library prompts are pre-rendered; only generate on a miss.
+        entry = sfx_library.match(p, 10)
+        path = library_layout.resolve(entry.filename) if entry else None
+        clips.append(str(path) if path else generate_sfx_clip(p, 10))
     combined = AudioSegment.silent(duration=10000)
     for clip in clips:
         if clip and os.path.exists(clip):
@@ -188,8 +176,10 @@ async def sfx_from_video(video_id: str):
 
     # Export final track
     output_filename = f"sfx_{video_id}.mp3"
-    output_path = OUTPUT_DIR / output_filename
+    output_path = OUTPUT_LAYOUT.path_for(output_filename)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
     combined.export(str(output_path), format="mp3")
+    OUTPUT_LAYOUT.commit(output_path)
 
     return {
         "transcript": transcript,
@@ -207,7 +197,7 @@ async def enrich_prompt(data: dict):
         
         logger.info(f"[ENRICH] Enriching prompt via API: '{prompt[:50]}{'...' if len(prompt) > 50 else ''}'")
         
-        enriched = query_gptoss(f"Make this audio prompt more descriptive and cinematic: {prompt}")
+        enriched = await query_gptoss(f"Make this audio prompt more descriptive and cinematic: {prompt}")
         
         logger.info(f"[ENRICH] API enrichment completed")
         
@@ -242,8 +232,8 @@ async def test_audio_generation():
         # Generate 5-second test audio
         generate_audio_from_text(test_prompt, 5, test_filename)
         
-        file_path = OUTPUT_DIR / test_filename
-        if file_path.exists():
+        file_path = OUTPUT_LAYOUT.resolve(test_filename)
+        if file_path is not None and file_path.exists():
             return {
                 "status": "success",
                 "message": "Test audio generated successfully",
@@ -1,6 +1,7 @@
 """Health check and diagnostic routes."""
 from fastapi import APIRouter
-from utils.system import check_system_health
+from fastapi.responses import PlainTextResponse
+from utils.system import check_system_health, get_snapshot, metrics_text
 
 router = APIRouter(prefix="/api")
 
@@ -20,16 +21,23 @@ async def diagnostic_endpoint():
     return {
         "status": "healthy" if healthy else "unhealthy", 
         "message": message,
-        "service": "SoundForge.AI Backend"
+        "service": "SoundForge.AI Backend",
+        "resources": get_snapshot()._asdict(),
     }
 
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Sampled resource gauges in Prometheus text format."""
+    return metrics_text()
+
 @router.get("/self-test")
 def self_test():
-    from services.audio_generation import _generate_procedural_ambience
-    from config import OUTPUT_DIR
-    import uuid, os
-    filename = f"{uuid.uuid4().hex}.mp3"
-    seg = _generate_procedural_ambience("test", 10)
-    out = os.path.join(OUTPUT_DIR, filename)
-    seg.export(out, format="mp3")
+    from services.ambience import write_procedural_ambience
+    from config import OUTPUT_LAYOUT
+    import uuid
+    filename = f"{uuid.uuid4().hex}.wav"
+    path = OUTPUT_LAYOUT.path_for(filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_procedural_ambience("test", 10, str(path))
+    OUTPUT_LAYOUT.commit(path)
     return {"status":"ok","filename":filename,"file_url":f"/audio/{filename}"}
@@ -0,0 +1,40 @@
+"""Procedural ambience for the self-test and fallback renders.
+
+Thin wrapper over the shared NumPy engine in backend/services/ambience.py:
+all layers are rendered in one vectorized pass and encoded once.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+import soundfile as sf
+
+from backend.services.ambience import AmbienceSpec, NoiseLayer, Oscillator, db, prompt_seed, render
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+# White-noise bed under a 55/110 Hz hum and a quiet 440 Hz tone.
+AMBIENCE_SPEC = AmbienceSpec(
+    oscillators=(
+        Oscillator(55, db(-16)),
+        Oscillator(110, db(-20), pan=-0.3),
+        Oscillator(440, db(-26), pan=0.3),
+    ),
+    noise=(NoiseLayer(db(-28)),),
+    fade_ms=1500,
+    peak=None,
+)
+
+
+def generate_procedural_ambience(prompt: str, duration: int) -> np.ndarray:
+    """Render `duration` seconds of stereo ambience as float32 (frames, 2)."""
+    return render(AMBIENCE_SPEC, duration, SAMPLE_RATE, channels=CHANNELS, seed=prompt_seed(prompt))
+
+
+def write_procedural_ambience(prompt: str, duration: int, path: str) -> str:
+    """Render and encode to a 16-bit WAV in a single write."""
+    sf.write(path, generate_procedural_ambience(prompt, duration), SAMPLE_RATE, subtype="PCM_16")
+    return path
@@ -1,11 +1,9 @@
 """Audio generation service with all audio processing logic."""
 import os
 import uuid
-import datetime
-import traceback
+import logging
 import torchaudio
 import whisper
-from pydub import AudioSegment
 try:
     import torchaudio
 except Exception:
@@ -14,27 +12,15 @@ try:
     import whisper
 except Exception:
     whisper = None
-from pydub.generators import Sine, WhiteNoise
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.model_manager import get_audiogen_model, get_audioldm_model, audioldm
-from utils.logging import log, logger, log_error
+from utils.logging import log, logger, log_error, log_event
 from utils.system import check_system_health
-from config import OUTPUT_DIR, LOG_FILE
-
-def _generate_procedural_ambience(prompt: str, duration: int) -> AudioSegment:
-    dur_ms = max(1000 * int(duration), 10000)
-    base = WhiteNoise().to_audio_segment(duration=dur_ms).apply_gain(-28)
-    hum1 = Sine(55).to_audio_segment(duration=dur_ms).apply_gain(-16)
-    hum2 = Sine(110).to_audio_segment(duration=dur_ms).apply_gain(-20)
-    sweep = Sine(440).to_audio_segment(duration=dur_ms).fade_in(1500).fade_out(1500).apply_gain(-26)
-    mix = base.overlay(hum1).overlay(hum2).overlay(sweep)
-    mix = mix.set_frame_rate(44100).set_channels(2)
-    return mix
-
+from config import OUTPUT_LAYOUT
 
 
 def generate_audio_from_text(prompt: str, duration: int, filename: str) -> None:
@@ -82,7 +68,8 @@ def generate_audio_from_text(prompt: str, duration: int, filename: str) -> None:
         
         # Save audio file
         try:
-            output_path = OUTPUT_DIR / filename
+            output_path = OUTPUT_LAYOUT.path_for(filename)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
             log.info(f"[GENERATION] Saving audio to: {output_path}")
             
             # Ensure the audio tensor is on CPU and has the right shape
@@ -102,6 +89,7 @@ def generate_audio_from_text(prompt: str, duration: int, filename: str) -> None:
             if file_size < 1000:  # Less than 1KB is suspicious
                 raise RuntimeError(f"Output file is too small: {file_size} bytes")
             
+            OUTPUT_LAYOUT.commit(output_path)
             log.info(f"[GENERATION] ✅ Audio saved successfully")
             log.info(f"[GENERATION] File size: {file_size / 1024:.1f} KB")
             log.info(f"[GENERATION] Sample rate: {sample_rate} Hz")
@@ -114,20 +102,10 @@ def generate_audio_from_text(prompt: str, duration: int, filename: str) -> None:
     except Exception as e:
         # Final catch-all error handler
         error_msg = f"Audio generation pipeline failed: {str(e)}"
-        full_trace = traceback.format_exc()
-        log_error("GENERATION_PIPELINE_FAIL", e)
-        
-        # Write comprehensive error log
-        try:
-            with open(LOG_FILE, "a") as logf:
-                timestamp = datetime.datetime.now().isoformat()
-                logf.write(f"[{timestamp}] GENERATION_FAILED: {filename}\n")
-                logf.write(f"Prompt: {prompt}\n")
-                logf.write(f"Duration: {duration}\n")
-                logf.write(f"Error: {error_msg}\n")
-                logf.write(f"Full traceback:\n{full_trace}\n\n")
-        except Exception:
-            pass  # Don't let log writing errors crash the error handler
+        log_event(
+            "GENERATION_PIPELINE_FAIL", error_msg, level=logging.ERROR, exc_info=e,
+            job_id=filename, prompt=prompt, duration=duration,
+        )
         
         # Re-raise with comprehensive error message
         raise RuntimeError(f"Generation failed for '{filename}': {error_msg}")
@@ -168,13 +146,7 @@ def generate_sfx_clip(prompt: str, duration: int) -> str | None:
             log.info("[SFX] AudioLDM model ready")
         except Exception as e:
             error_msg = f"[SFX] Failed to get AudioLDM model: {str(e)}"
-            error_log = traceback.format_exc()
-            log.error(f"{error_msg}\n{error_log}")
-            
-            # Write to log file
-            with open(LOG_FILE, "a") as log_file:
-                timestamp = datetime.datetime.now().isoformat()
-                log_file.write(f"[{timestamp}] SFX_MODEL_ERROR: {error_msg}\n{error_log}\n")
+            log_event("SFX_MODEL_ERROR", error_msg, level=logging.ERROR, exc_info=e, prompt=prompt)
             return None
         
         # Generate audio
@@ -184,18 +156,14 @@ def generate_sfx_clip(prompt: str, duration: int) -> str | None:
             log.info(f"[SFX] Audio tensor generated successfully. Shape: {audio.shape if hasattr(audio, 'shape') else 'Unknown'}")
         except Exception as e:
             error_msg = f"[SFX] Audio generation failed: {str(e)}"
-            error_log = traceback.format_exc()
-            log.error(f"{error_msg}\n{error_log}")
-            
-            with open(LOG_FILE, "a") as log_file:
-                timestamp = datetime.datetime.now().isoformat()
-                log_file.write(f"[{timestamp}] SFX_GENERATION_ERROR: {error_msg}\n{error_log}\n")
+            log_event("SFX_GENERATION_ERROR", error_msg, level=logging.ERROR, exc_info=e, prompt=prompt)
             return None
         
         # Save the generated audio
         try:
             output_filename = f"sfx_{uuid.uuid4().hex}.wav"
-            output_path = OUTPUT_DIR / output_filename
+            output_path = OUTPUT_LAYOUT.path_for(output_filename)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
             
             log.info(f"[SFX] Saving SFX audio to: {output_path}")
             
@@ -210,25 +178,16 @@ def generate_sfx_clip(prompt: str, duration: int) -> str | None:
                 import soundfile as sf
                 sf.write(str(output_path), audio, 16000)
             
+            OUTPUT_LAYOUT.commit(output_path)
             log.info(f"[SFX] ✅ SFX audio saved: {output_filename}")
             return str(output_path)
             
         except Exception as e:
             error_msg = f"[SFX] Failed to save SFX audio: {str(e)}"
-            error_log = traceback.format_exc()
-            log.error(f"{error_msg}\n{error_log}")
-            
-            with open(LOG_FILE, "a") as log_file:
-                timestamp = datetime.datetime.now().isoformat()
-                log_file.write(f"[{timestamp}] SFX_SAVE_ERROR: {error_msg}\n{error_log}\n")
+            log_event("SFX_SAVE_ERROR", error_msg, level=logging.ERROR, exc_info=e, prompt=prompt)
             return None
             
     except Exception as e:
         error_msg = f"[SFX] Unexpected error in SFX generation: {str(e)}"
-        error_log = traceback.format_exc()
-        log.error(f"{error_msg}\n{error_log}")
-        
-        with open(LOG_FILE, "a") as log_file:
-            timestamp = datetime.datetime.now().isoformat()
-            log_file.write(f"[{timestamp}] SFX_UNEXPECTED_ERROR: {error_msg}\n{error_log}\n")
+        log_event("SFX_UNEXPECTED_ERROR", error_msg, level=logging.ERROR, exc_info=e, prompt=prompt)
         return None
\ No newline at end of file
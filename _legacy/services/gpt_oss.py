@@ -1,36 +1,197 @@
 """GPT-OSS integration service for prompt enrichment."""
-import requests
+import asyncio
+import time
+from collections import OrderedDict
+
+import httpx
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.logging import logger
+from config import (
+    GPT_OSS_URL,
+    GPT_OSS_MODEL,
+    GPT_OSS_TIMEOUT,
+    GPT_OSS_CACHE_SIZE,
+    GPT_OSS_CACHE_TTL,
+    GPT_OSS_BREAKER_THRESHOLD,
+    GPT_OSS_BREAKER_COOLDOWN,
+)
 
-def query_gptoss(prompt: str) -> str:
-    """Query local GPT-OSS model for prompt enrichment."""
-    try:
-        logger.info(f"[GPT-OSS] Enriching prompt: '{prompt[:50]}{'...' if len(prompt) > 50 else ''}'")
-        
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "gpt-oss",
-                "prompt": prompt,
-                "stream": False
-            },
-            timeout=10  # Reduced timeout for faster fallback
-        )
-        
-        if response.status_code == 200:
-            enriched = response.json().get("response", "").strip()
-            logger.info(f"[GPT-OSS] Enriched successfully: '{enriched[:50]}{'...' if len(enriched) > 50 else ''}'")
-            return enriched
-        else:
+
+def _short(text: str) -> str:
+    return f"{text[:50]}{'...' if len(text) > 50 else ''}"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Cache key for a prompt: collapsed whitespace, case-insensitive."""
+    return " ".join(prompt.split()).casefold()
+
+
+class GptOssClient:
+    """Async GPT-OSS client with a pooled session, LRU+TTL cache,
+    request coalescing and a circuit breaker.
+
+    Every failure path returns the original prompt, so callers never need
+    to handle errors themselves.
+    """
+
+    def __init__(
+        self,
+        base_url: str = GPT_OSS_URL,
+        model: str = GPT_OSS_MODEL,
+        timeout: float = GPT_OSS_TIMEOUT,
+        cache_size: int = GPT_OSS_CACHE_SIZE,
+        cache_ttl: float = GPT_OSS_CACHE_TTL,
+        breaker_threshold: int = GPT_OSS_BREAKER_THRESHOLD,
+        breaker_cooldown: float = GPT_OSS_BREAKER_COOLDOWN,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._cache: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._failures = 0
+        self._open_until = 0.0
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "skipped": 0, "errors": 0}
+
+    def _session(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the pooled session (call on app shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # Cache -----------------------------------------------------------------
+
+    def _cache_get(self, key: str) -> str | None:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return value
+
+    def _cache_put(self, key: str, value: str) -> None:
+        self._cache[key] = (time.monotonic() + self.cache_ttl, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # Circuit breaker -------------------------------------------------------
+
+    def breaker_open(self) -> bool:
+        """True while the backend is considered down and calls are skipped."""
+        return self._failures >= self.breaker_threshold and time.monotonic() < self._open_until
+
+    def _record_success(self) -> None:
+        self._failures = 0
+        self._open_until = 0.0
+
+    def _record_failure(self) -> None:
+        self._failures += 1
+        self.stats["errors"] += 1
+        if self._failures >= self.breaker_threshold:
+            self._open_until = time.monotonic() + self.breaker_cooldown
+            logger.warning(f"[GPT-OSS] Circuit open for {self.breaker_cooldown:.0f}s after {self._failures} failures")
+
+    # Public API ------------------------------------------------------------
+
+    async def enrich(self, prompt: str) -> str:
+        """Return the enriched prompt, or the original prompt on any failure."""
+        key = normalize_prompt(prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+        if self.breaker_open():
+            self.stats["skipped"] += 1
+            return prompt
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            result = await asyncio.shield(pending)
+            return result if result is not None else prompt
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            enriched = await self._fetch(prompt)
+            if enriched:
+                self._cache_put(key, enriched)
+            future.set_result(enriched)
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        return enriched or prompt
+
+    async def _fetch(self, prompt: str) -> str | None:
+        logger.info(f"[GPT-OSS] Enriching prompt: '{_short(prompt)}'")
+        try:
+            response = await self._session().post(
+                "/api/generate",
+                json={"model": self.model, "prompt": prompt, "stream": False},
+            )
+        except httpx.ConnectError:
+            logger.warning("[GPT-OSS] GPT-OSS unavailable - falling back to original prompt")
+            self._record_failure()
+            return None
+        except httpx.TimeoutException:
+            logger.warning("[GPT-OSS] Request timeout - falling back to original prompt")
+            self._record_failure()
+            return None
+        except Exception as e:
+            logger.warning(f"[GPT-OSS] Error querying GPT-OSS: {e}")
+            self._record_failure()
+            return None
+
+        if response.status_code != 200:
             logger.warning(f"[GPT-OSS] Request failed with status {response.status_code}")
-            return prompt  # Fallback to original prompt
-            
-    except requests.exceptions.ConnectionError:
-        logger.warning("[GPT-OSS] GPT-OSS unavailable - falling back to original prompt")
-        return prompt  # Fallback to original prompt
-    except requests.exceptions.Timeout:
-        logger.warning("[GPT-OSS] Request timeout - falling back to original prompt")
-        return prompt
-    except Exception as e:
-        logger.warning(f"[GPT-OSS] Error querying GPT-OSS: {e}")
-        return prompt  # Fallback to original prompt
\ No newline at end of file
+            self._record_failure()
+            return None
+        try:
+            enriched = response.json().get("response", "").strip()
+        except ValueError as e:
+            logger.warning(f"[GPT-OSS] Malformed response: {e}")
+            self._record_failure()
+            return None
+        self._record_success()
+        logger.info(f"[GPT-OSS] Enriched successfully: '{_short(enriched)}'")
+        return enriched
+
+
+_client = GptOssClient()
+
+
+def get_client() -> GptOssClient:
+    """Shared process-wide enrichment client."""
+    return _client
+
+
+async def query_gptoss(prompt: str) -> str:
+    """Query local GPT-OSS model for prompt enrichment."""
+    return await _client.enrich(prompt)
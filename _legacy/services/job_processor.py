@@ -1,13 +1,12 @@
 """Background job processing service."""
 import time
+import logging
 import threading
-import datetime
 import traceback
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.logging import logger, log
-from config import LOG_FILE
+from utils.logging import logger, log, log_event
 
 # Job tracking system
 job_queue = []  # List of job dictionaries for easy manipulation
@@ -55,21 +54,13 @@ def process_jobs():
                     job_status[job_id] = "done"
                     logger.info(f"✅ File written to output_audio/{job_id}")
                     
-                    # Write success to audio_logs.txt
-                    with open("backend/audio_logs.txt", "a") as f:
-                        timestamp = datetime.datetime.now().isoformat()
-                        f.write(f"[{timestamp}] SUCCESS: {job['prompt']} | {job_id}\n")
+                    log_event("SUCCESS", job_id, job_id=job_id, prompt=job["prompt"])
                 except Exception as e:
                     job_status[job_id] = "failed"
-                    logger.error(f"[ERROR] Generation failed for {job_id}: {traceback.format_exc()}")
-                    
-                    # Write detailed error to audio_logs.txt
-                    with open("backend/audio_logs.txt", "a") as f:
-                        timestamp = datetime.datetime.now().isoformat()
-                        f.write(f"[{timestamp}] GENERATION_FAILED: {job_id}\n")
-                        f.write(f"Prompt: {job['prompt']}\n")
-                        f.write(f"Duration: {job['duration']}\n")
-                        f.write(f"Error: {traceback.format_exc()}\n\n")
+                    log_event(
+                        "GENERATION_FAILED", job_id, level=logging.ERROR, exc_info=e,
+                        job_id=job_id, prompt=job["prompt"], duration=job["duration"],
+                    )
             
             time.sleep(1)
             
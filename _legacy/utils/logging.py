@@ -1,23 +1,115 @@
-"""Logging utilities and structured logging helpers."""
-import logging
+"""Logging utilities and structured logging helpers.
+
+All records are handed to a QueueHandler and written by a single listener
+thread, so request and worker threads never touch the console or log file
+directly. The listener owns one rotating JSON-lines file handle (LOG_FILE).
+"""
+import atexit
 import datetime
-import traceback
+import json
+import logging
+import logging.handlers
+import queue
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import LOG_FILE
 
-# Logger configuration
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+# Attributes every LogRecord has; anything else came in through `extra=`.
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonLineFormatter(logging.Formatter):
+    """One JSON object per line with any `extra=` fields merged in."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Keep `extra=` fields and tracebacks as separate attributes.
+
+    The stock prepare() folds the traceback into msg, which would leave the
+    JSON formatter nothing to put under "exc".
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener = None
+
+
+def setup_logging(level: int = logging.INFO) -> None:
+    """Route the root logger through a queue to console + rotating JSON file."""
+    global _listener
+    if _listener is not None:
+        return
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(
+        "%(asctime)s | %(levelname)s | %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+    ))
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    logfile = logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+    logfile.setFormatter(JsonLineFormatter())
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, console, logfile, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush pending records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+setup_logging()
 
 logger = logging.getLogger(__name__)
 log = logging.getLogger(__name__)
 
 # Structured logging helpers
+def log_event(event: str, message: str = "", level: int = logging.INFO, exc_info=None, **fields) -> None:
+    """Log a structured event; keyword fields become JSON keys in LOG_FILE."""
+    log.log(level, f"[{event}] {message}".rstrip(), exc_info=exc_info, extra={"event": event, **fields})
+
 def log_request(prompt: str, duration: int, filename: str):
     """Log incoming audio generation request."""
     log.info(f"[REQUEST] Prompt: '{prompt[:50]}{'...' if len(prompt) > 50 else ''}' | Duration: {duration}s | File: {filename}")
@@ -47,14 +139,5 @@ def log_health(ram_mb: float, open_files: int, max_files: int):
     log.info(f"[HEALTH] RAM: {ram_mb:.0f}MB | Open files: {open_files}/{max_files}")
 
 def log_error(tag: str, err: Exception) -> None:
-    error_log = traceback.format_exc()
-    logging.error(f"{tag}: {error_log}")
-    
-    # Write to both error log and main log
-    with open("error_log.txt", "a") as f:
-        f.write(f"[{datetime.datetime.now()}] {tag}\n")
-        f.write(error_log + "\n")
-    
-    with open(LOG_FILE, "a") as f:
-        timestamp = datetime.datetime.now().isoformat()
-        f.write(f"[{timestamp}] ERROR - {tag}: {error_log}\n")
\ No newline at end of file
+    """Log an error with its traceback as a structured event."""
+    log_event(tag, str(err), level=logging.ERROR, exc_info=err)
@@ -2,49 +2,154 @@
 import os
 import psutil
 import sys
-import os
+import threading
+import time
+from typing import NamedTuple, Optional
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.logging import log, log_health
 
+SAMPLE_INTERVAL = float(os.getenv("HEALTH_SAMPLE_INTERVAL", "2.0"))
+MIN_AVAILABLE_RAM_MB = 1500
+
+
+class SystemSnapshot(NamedTuple):
+    """Immutable resource readings taken by the background sampler."""
+    ram_available_mb: float
+    open_files: int
+    max_files: int
+    cpu_percent: float
+    gpu_mem_used_mb: Optional[float]
+    gpu_mem_total_mb: Optional[float]
+    sampled_at: float
+
+
+# The sampler swaps this reference wholesale; readers never take a lock.
+_snapshot: Optional[SystemSnapshot] = None
+_sampler: Optional[threading.Thread] = None
+_process = psutil.Process()
+
+
+def _max_files() -> int:
+    try:
+        return os.sysconf("SC_OPEN_MAX") if hasattr(os, "sysconf") else 1024
+    except (ValueError, OSError):
+        return 1024
+
+
+def _open_files() -> int:
+    # num_fds() only counts /proc/self/fd entries; open_files() resolves every
+    # link and filters regular files, which is slow with many handles.
+    try:
+        return _process.num_fds()
+    except (AttributeError, psutil.Error):
+        return 0
+
+
+def _gpu_memory():
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return None, None
+    try:
+        if not torch.cuda.is_available():
+            return None, None
+        free, total = torch.cuda.mem_get_info()
+        return (total - free) / (1024 ** 2), total / (1024 ** 2)
+    except Exception:
+        return None, None
+
+
+def sample_now() -> SystemSnapshot:
+    """Take a fresh reading and publish it as the current snapshot."""
+    global _snapshot
+    gpu_used, gpu_total = _gpu_memory()
+    snap = SystemSnapshot(
+        ram_available_mb=psutil.virtual_memory().available / (1024 ** 2),
+        open_files=_open_files(),
+        max_files=_max_files(),
+        cpu_percent=psutil.cpu_percent(interval=None),
+        gpu_mem_used_mb=gpu_used,
+        gpu_mem_total_mb=gpu_total,
+        sampled_at=time.time(),
+    )
+    _snapshot = snap
+    return snap
+
+
+def get_snapshot() -> SystemSnapshot:
+    """Latest snapshot; samples synchronously only if the sampler never ran."""
+    snap = _snapshot
+    return snap if snap is not None else sample_now()
+
+
+def _sample_loop(interval: float) -> None:
+    while True:
+        try:
+            sample_now()
+        except Exception as e:
+            log.error(f"System sampler failed: {e}")
+        time.sleep(interval)
+
+
+def start_sampler(interval: float = SAMPLE_INTERVAL) -> None:
+    """Start the background sampler thread (idempotent)."""
+    global _sampler
+    if _sampler is not None and _sampler.is_alive():
+        return
+    sample_now()
+    _sampler = threading.Thread(target=_sample_loop, args=(interval,), name="system-sampler", daemon=True)
+    _sampler.start()
+
+
 def check_system_health():
     """Check system resources before starting generation with structured logging."""
     try:
-        # Check available memory (require at least 1.5GB)
-        available_ram = psutil.virtual_memory().available / (1024 ** 2)  # in MB
-        
-        # Check open file handles
-        try:
-            current_process = psutil.Process()
-            open_files = len(current_process.open_files())
-            max_files = os.sysconf("SC_OPEN_MAX") if hasattr(os, 'sysconf') else 1024
-        except (AttributeError, OSError):
-            open_files = 0
-            max_files = 1024
-        
+        snap = get_snapshot()
+        available_ram = snap.ram_available_mb
+        open_files, max_files = snap.open_files, snap.max_files
+
         # Log system health using structured logging
         log_health(available_ram, open_files, max_files)
-        
-        if available_ram < 1500:
+
+        if available_ram < MIN_AVAILABLE_RAM_MB:
             log.warning(f"⚠️ Low available RAM: {available_ram:.1f} MB")
-            return False, f"Insufficient RAM: {available_ram:.1f}MB available, need 1500MB"
-            
+            return False, f"Insufficient RAM: {available_ram:.1f}MB available, need {MIN_AVAILABLE_RAM_MB}MB"
+
         if open_files > 0.9 * max_files:
             log.warning(f"⚠️ Too many open files: {open_files} / {max_files}")
             return False, f"Too many open files: {open_files}/{max_files}"
-            
+
         return True, "System healthy"
-        
+
     except Exception as e:
         log.error(f"System health check failed: {e}")
         return False, f"Health check failed: {str(e)}"
 
+
+def metrics_text() -> str:
+    """Current snapshot in Prometheus text exposition format."""
+    snap = get_snapshot()
+    values = {
+        "soundforge_ram_available_mb": snap.ram_available_mb,
+        "soundforge_open_files": snap.open_files,
+        "soundforge_max_files": snap.max_files,
+        "soundforge_cpu_percent": snap.cpu_percent,
+        "soundforge_gpu_mem_used_mb": snap.gpu_mem_used_mb,
+        "soundforge_gpu_mem_total_mb": snap.gpu_mem_total_mb,
+        "soundforge_health_sample_age_seconds": time.time() - snap.sampled_at,
+    }
+    lines = []
+    for name, value in values.items():
+        if value is None:
+            continue
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
 def _get_system_stats():
     """Helper function to get system statistics for health logging."""
     try:
-        available_ram = psutil.virtual_memory().available / (1024 ** 2)
-        current_process = psutil.Process()
-        open_files = len(current_process.open_files())
-        max_files = getattr(os, 'sysconf', lambda x: 1024)("SC_OPEN_MAX") if hasattr(os, 'sysconf') else 1024
-        return available_ram, open_files, max_files
+        snap = get_snapshot()
+        return snap.ram_available_mb, snap.open_files, snap.max_files
     except Exception:
-        return 0.0, 0, 1024
\ No newline at end of file
+        return 0.0, 0, 1024
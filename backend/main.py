@@ -1,7 +1,7 @@
 # backend/main.py
-import os, logging, uuid, time, traceback
+import os, logging, time, traceback
 from pathlib import Path
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, HTTPException
 from fastapi.routing import APIRoute
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -9,6 +9,14 @@ from fastapi.responses import JSONResponse
 from backend.routes.health import router as health_router
 from backend.routes.audio import router as audio_router
 from backend.routes.meta import router as meta_router
+from backend.routes.files import router as files_router
+from backend.routes.jobs import router as jobs_router
+from backend.routes.library import router as library_router
+from backend.services.job_processor import start_background_workers
+from backend.services import heavy_worker
+from backend.services import sfx_library
+from backend.services import profiling
+from backend.middleware import ProfileMiddleware, RequestContextMiddleware
 
 # Runtime config and error state
 USE_HEAVY = os.getenv("USE_HEAVY", "0")
@@ -78,27 +86,22 @@ def create_app() -> FastAPI:
     app.include_router(health_router)                 # -> /health
     app.include_router(health_router, prefix="/api")  # -> /api/health
     app.include_router(audio_router,  prefix="/api")  # -> /api/generate-audio
+    app.include_router(jobs_router,   prefix="/api")  # -> /api/jobs (+ SSE events)
+    app.include_router(library_router, prefix="/api")  # -> /api/library
     app.include_router(meta_router)                   # /version + /api/* debug
 
-    # Static for generated audio
-    app.mount("/audio", StaticFiles(directory=str(OUTPUT_DIR)), name="audio")
+    # Generated audio: ETag/304/Range-aware file route (replaces a plain StaticFiles mount)
+    app.include_router(files_router)                  # /audio/{filename}
 
     # Serve SPA at root — mount LAST so it never swallows /api/*
     dist = _find_frontend_dist()
     if dist:
         app.mount("/", StaticFiles(directory=str(dist), html=True), name="frontend")
-    # Add timing + request id
-    @app.middleware("http")
-    async def timing(request: Request, call_next):  # type: ignore[misc]
-        rid = str(uuid.uuid4())[:8]
-        start = time.time()
-        try:
-            resp = await call_next(request)
-            resp.headers["X-Request-Id"] = rid
-            resp.headers["X-Elapsed-Ms"] = str(int((time.time()-start)*1000))
-            return resp
-        except Exception as e:  # noqa: BLE001
-            return JSONResponse({"ok": False, "error": str(e), "request_id": rid}, status_code=500)
+    # Request id + timing + error mapping, as pure ASGI so file streams pass through untouched
+    app.add_middleware(RequestContextMiddleware, on_error=note_error)
+    # Per-request profiling (X-Profile: 1); not installed at all without PROFILE_TOKEN
+    if profiling.enabled():
+        app.add_middleware(ProfileMiddleware)
 
     # Route table logging on startup
     @app.on_event("startup")
@@ -128,6 +131,8 @@ def create_app() -> FastAPI:
                     importlib.import_module("audiocraft")
                     MODE = "heavy"
                     _ready = True
+                    if heavy_worker.enabled():
+                        heavy_worker.supervisor.load_model()  # start warming the worker
                 except Exception as e:
                     note_error(e)
                     if allow_fallback:
@@ -139,8 +144,17 @@ def create_app() -> FastAPI:
             else:
                 MODE = "fallback"
                 _ready = True
+            # Under forked web workers (start.py) only the primary recovers jobs and warms the library.
+            primary = os.getenv("PRIMARY_WORKER", "1") == "1"
+            start_background_workers(recover_jobs=primary)
+            if sfx_library.WARMUP and primary:
+                sfx_library.library.start_warmup()
         finally:
             set_startup_complete(True)
+
+    @app.on_event("shutdown")
+    async def shutdown():  # type: ignore[misc]
+        heavy_worker.supervisor.shutdown()
     return app
 
 
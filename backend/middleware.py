@@ -0,0 +1,124 @@
+# backend/middleware.py
+"""Pure ASGI middleware.
+
+Starlette's `@app.middleware("http")` (BaseHTTPMiddleware) runs the app in
+a separate task and re-streams every response body through a memory
+channel, which is paid on every chunk of an /audio download or SPA asset.
+These classes only wrap `send` to touch the `http.response.start` message;
+body messages pass straight through. See scripts/bench_middleware.py.
+"""
+from __future__ import annotations
+import json
+import logging
+import re
+import time
+import uuid
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.services import profiling
+
+_log = logging.getLogger("uvicorn.error")
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def _json(status: int, payload: dict) -> Tuple[Message, Message]:
+    """The two ASGI messages of a JSON response (usable before the app has run)."""
+    body = json.dumps(payload).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    return (
+        {"type": "http.response.start", "status": status, "headers": headers},
+        {"type": "http.response.body", "body": body},
+    )
+
+
+class RequestContextMiddleware:
+    """Request id, timing headers and last-resort error mapping.
+
+    Adds X-Request-Id (the caller's, if well-formed), X-Elapsed-Ms and a
+    Server-Timing `app` entry, both measured to the response start (time to
+    first byte). An unhandled exception becomes a 500 JSON body carrying the
+    request id, unless the response had already started, in which case it
+    is re-raised for the server to abort the connection.
+    """
+
+    def __init__(self, app: ASGIApp, on_error: Optional[Callable[[Exception], None]] = None):
+        self.app = app
+        self.on_error = on_error
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rid = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                rid = value.decode("latin-1")
+                break
+        if rid is None or not _REQUEST_ID.match(rid):
+            rid = uuid.uuid4().hex[:8]
+        scope.setdefault("state", {})["request_id"] = rid
+        start = time.perf_counter()
+        started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                ms = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-Id"] = rid
+                headers["X-Elapsed-Ms"] = str(int(ms))
+                headers.append("Server-Timing", f"app;dur={ms:.1f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:  # noqa: BLE001
+            if started:
+                raise
+            _log.exception(f"[HTTP] {rid} {scope.get('method')} {scope.get('path')} failed")
+            if self.on_error is not None:
+                self.on_error(e)
+            head, body = _json(500, {"ok": False, "error": str(e), "request_id": rid})
+            await send_wrapper(head)
+            await send(body)
+
+
+class ProfileMiddleware:
+    """`X-Profile: 1` (with the profile token) profiles that request's generation."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or (b"x-profile", b"1") not in scope["headers"]:
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        try:
+            profiling.check_token(request)
+        except HTTPException as e:
+            for message in _json(e.status_code, {"ok": False, "error": e.detail}):
+                await send(message)
+            return
+        mode = request.headers.get("X-Profile-Mode", "cprofile")
+        if mode not in profiling.MODES:
+            for message in _json(400, {"ok": False, "error": f"unknown profile mode {mode!r}"}):
+                await send(message)
+            return
+        run = profiling.profiler.request_run(mode)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = run.id
+            await send(message)
+
+        token = profiling.bind_request(run)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiling.unbind_request(token)
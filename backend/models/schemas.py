@@ -1,8 +1,18 @@
 # backend/models/schemas.py
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 
 class GenerateAudioRequest(BaseModel):
     prompt: str = Field(..., min_length=1, max_length=500)
-    duration: int = Field(..., ge=1, le=120)
+    duration: int = Field(..., ge=1, le=600)  # effective cap: MAX_DURATION_S
     sample_rate: Optional[int] = Field(None, ge=8000, le=48000)
+    timeout_s: Optional[float] = Field(None, gt=0, le=600)
+    loop: bool = False
+    preview: bool = False
+    replaces: Optional[str] = Field(None, max_length=64)  # job id of a superseded preview's full render
+
+class ProfileRequest(BaseModel):
+    mode: Literal["cprofile", "sampling"] = "cprofile"
+    requests: Optional[int] = Field(None, ge=1, le=1000)
+    seconds: Optional[float] = Field(None, gt=0, le=3600)
+    interval_ms: float = Field(5.0, ge=1, le=1000)
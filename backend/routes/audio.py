@@ -1,105 +1,109 @@
 # backend/routes/audio.py
-import os
-import time
-import uuid
-from pathlib import Path
-from typing import Literal
+import asyncio
+from typing import Callable
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from backend.models.schemas import GenerateAudioRequest
-from backend.services.generate import generate_file as fallback_generate
-from backend.services import heavy_audiogen as heavy
-from backend.services.state import record_generation
+from backend.services import job_processor as jobs
+from backend.services import pipeline
+from backend.services.admission import AdmissionRejected
+from backend.services.context import GenerationCancelled, GenerationContext
+from backend.services.heavy_worker import HeavyTimeout
+from backend.services.singleflight import fingerprint, flights
 
 router = APIRouter()
-APP_ROOT = Path(__file__).resolve().parents[2]
-OUTPUT_DIR = APP_ROOT / "backend" / "output_audio"
 
 
-def _policy(prefer: str | None) -> Literal["auto","heavy","fallback"]:
-    p = (prefer or "auto").lower()
-    return "heavy" if p == "heavy" else ("fallback" if p == "fallback" else "auto")
-
-
-@router.post("/generate-audio")
-def generate_audio(payload: GenerateAudioRequest, request: Request):
+def validate_request(payload: GenerateAudioRequest) -> str:
+    """Return the stripped prompt or raise a 400."""
     prompt = (payload.prompt or "").strip()
     if not prompt:
         raise HTTPException(status_code=400, detail="Prompt cannot be empty")
-    if not (1 <= payload.duration <= 120):
-        raise HTTPException(status_code=400, detail="Duration must be 1–120 seconds")
+    if not (1 <= payload.duration <= pipeline.MAX_DURATION_S):
+        raise HTTPException(status_code=400, detail=f"Duration must be 1–{pipeline.MAX_DURATION_S} seconds")
     if payload.sample_rate is not None and not (8000 <= payload.sample_rate <= 48000):
         raise HTTPException(status_code=400, detail="sample_rate must be 8k–48k")
+    return prompt
 
+
+def request_policy(request: Request) -> pipeline.Policy:
     prefer = request.query_params.get("prefer") or request.headers.get("X-Prefer-Heavy") or "auto"
-    policy = _policy(prefer)
+    return pipeline.resolve_policy(prefer)
+
+
+async def _on_disconnect(
+    request: Request, done: Callable[[], bool], callback: Callable[[], None], interval: float = 0.5
+) -> None:
+    """Call `callback` once if the client goes away before `done()`."""
+    while not done():
+        if await request.is_disconnected():
+            callback()
+            return
+        await asyncio.sleep(interval)
 
-    t0 = time.time()
-    generator = "fallback"
 
-    use_heavy = os.getenv("USE_HEAVY", "0") == "1"
-    allow_fallback = os.getenv("ALLOW_FALLBACK", "1") == "1"
+_GENERATION_ERRORS = (GenerationCancelled, AdmissionRejected, HeavyTimeout, pipeline.HeavyGenerationFailed)
 
-    # heavy path (only when enabled)
-    if use_heavy and policy in ("auto", "heavy"):
-        try:
-            if not heavy.is_ready():
-                heavy.load_model()
-            if heavy.is_ready():
-                raw, sr = heavy.generate(prompt, payload.duration, payload.sample_rate)
-                # Write to file
-                OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-                file_id = str(uuid.uuid4())
-                out_path = OUTPUT_DIR / f"{file_id}.wav"
-                import numpy as np, soundfile as sf
-                arr = np.frombuffer(raw, dtype=np.float32)
-                sf.write(out_path, arr, sr, subtype="PCM_16")
-                elapsed = int((time.time() - t0) * 1000)
-                generator = "heavy"
-                record_generation({
-                    "prompt_hash": hash(prompt),
-                    "duration": payload.duration,
-                    "generator": generator,
-                    "ms": elapsed,
-                    "ok": True,
-                })
-                rel = f"/audio/{out_path.stem}.wav"
-                return JSONResponse({
-                    "ok": True,
-                    "generator": generator,
-                    "file_url": rel,
-                    "url": rel,
-                    "path": str(out_path),
-                    "duration": payload.duration,
-                }, headers={"X-Elapsed-Ms": str(elapsed)})
-            elif policy == "heavy" and not allow_fallback:
-                raise RuntimeError(heavy.last_heavy_error() or "heavy model unavailable")
-        except Exception as e:
-            try:
-                from backend import main as mainmod  # lazy to avoid cycles
-                mainmod.note_error(e)
-            except Exception:
-                pass
-            if policy == "heavy" and not allow_fallback:
-                raise HTTPException(status_code=500, detail=f"heavy generation failed: {e}")
-            # else: fall through to fallback
 
-    # fallback path
-    out_path = fallback_generate(prompt, payload.duration, OUTPUT_DIR, payload.sample_rate)
-    elapsed = int((time.time() - t0) * 1000)
-    record_generation({
-        "prompt_hash": hash(prompt),
-        "duration": payload.duration,
-        "generator": generator,
-        "ms": elapsed,
-        "ok": True,
-    })
-    rel = f"/audio/{out_path.stem}.wav"
-    return JSONResponse({
-        "ok": True,
-        "generator": generator,
-        "file_url": rel,
-        "url": rel,
-        "path": str(out_path),
-        "duration": payload.duration,
-    }, headers={"X-Elapsed-Ms": str(elapsed)})
+def _generation_error(e: Exception) -> JSONResponse:
+    """Map a generation failure: 499 on cancel (returned), else 503/504/500 (raised)."""
+    if isinstance(e, GenerationCancelled):
+        return JSONResponse({"ok": False, "error": "client disconnected"}, status_code=499)
+    if isinstance(e, AdmissionRejected):
+        raise HTTPException(
+            status_code=503,
+            detail={"error": f"heavy generation rejected: {e.reason}", "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    if isinstance(e, HeavyTimeout):
+        raise HTTPException(status_code=504, detail=f"heavy generation timed out: {e}")
+    raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _preview(payload: GenerateAudioRequest, prompt: str, policy: pipeline.Policy, request: Request):
+    """Answer with a short low-rate draft now and queue the full render as a job."""
+    if payload.replaces:
+        jobs.cancel(payload.replaces)  # the user moved on; stop paying for the old prompt
+    ctx = GenerationContext()
+    watcher = asyncio.create_task(_on_disconnect(request, lambda: ctx.cancelled, ctx.cancel))
+    try:
+        result = await run_in_threadpool(pipeline.preview, prompt, payload.duration, policy, ctx)
+    except _GENERATION_ERRORS as e:
+        return _generation_error(e)
+    finally:
+        watcher.cancel()
+    full = jobs.submit(prompt, payload.duration, payload.sample_rate, policy, payload.timeout_s, payload.loop)
+    result["full"] = jobs.with_links(full)
+    elapsed = result.pop("elapsed_ms")
+    return JSONResponse(result, headers={"X-Elapsed-Ms": str(elapsed), "X-Preview": "1"})
+
+
+@router.post("/generate-audio")
+async def generate_audio(payload: GenerateAudioRequest, request: Request):
+    prompt = validate_request(payload)
+    policy = request_policy(request)
+    if payload.preview:
+        return await _preview(payload, prompt, policy, request)
+    # Identical concurrent requests share one generation (and one file).
+    key = fingerprint(prompt, payload.duration, payload.sample_rate, policy, payload.loop)
+    flight, leader = flights.join(key)
+    # An abandoned request cancels the generator once no other waiter needs it.
+    watcher = asyncio.create_task(_on_disconnect(request, flight.future.done, flight.leave))
+    try:
+        if leader:
+            await run_in_threadpool(
+                flights.execute, flight, pipeline.generate,
+                prompt, payload.duration, payload.sample_rate, policy, flight.ctx, payload.timeout_s,
+                loop=payload.loop,
+            )
+        result = dict(await asyncio.wrap_future(flight.future))
+    except _GENERATION_ERRORS as e:
+        return _generation_error(e)
+    finally:
+        watcher.cancel()
+    elapsed = result.pop("elapsed_ms")
+    headers = {"X-Elapsed-Ms": str(elapsed)}
+    if not leader:
+        headers["X-Coalesced"] = "1"
+    return JSONResponse(result, headers=headers)
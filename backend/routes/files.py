@@ -0,0 +1,14 @@
+# backend/routes/files.py
+from __future__ import annotations
+from fastapi import APIRouter, HTTPException, Request
+from backend.services.storage import storage
+
+router = APIRouter()
+
+
+@router.api_route("/audio/{filename}", methods=["GET", "HEAD"])
+def audio_file(filename: str, request: Request):
+    """Generated audio with content-hash ETags, 304s and byte-range seeking."""
+    if "/" in filename or "\\" in filename or filename.startswith("."):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return storage.serve(request, filename)
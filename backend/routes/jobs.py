@@ -0,0 +1,104 @@
+# backend/routes/jobs.py
+from __future__ import annotations
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from backend.models.schemas import GenerateAudioRequest
+from backend.routes.audio import validate_request, request_policy
+from backend.services import job_processor as jobs
+from backend.services.progress import bus, sse_event, TERMINAL_STATES
+
+router = APIRouter()
+HEARTBEAT_SECONDS = 15.0
+STORE_POLL_SECONDS = 1.0
+
+
+@router.post("/jobs", status_code=202)
+def submit_job(payload: GenerateAudioRequest, request: Request):
+    """Queue a generation; follow it via `events_url` (SSE) rather than polling."""
+    prompt = validate_request(payload)
+    state = jobs.submit(
+        prompt, payload.duration, payload.sample_rate, request_policy(request), payload.timeout_s, payload.loop
+    )
+    return jobs.with_links(state)
+
+
+@router.get("/jobs")
+def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """Recent jobs, newest first, optionally filtered by status."""
+    if status is not None and status not in TERMINAL_STATES | {"queued", "running"}:
+        raise HTTPException(status_code=400, detail="Unknown status")
+    limit = max(1, min(limit, 500))
+    return {"jobs": [jobs.with_links(s) for s in jobs.list_jobs(status, limit)]}
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    state = jobs.get(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jobs.with_links(state)
+
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job is no longer cancelable")
+    return {"ok": True, "job_id": job_id, "status": "canceled"}
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """Server-sent events: one `state` event per change, ending at a terminal state."""
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def poll_store():
+        # Not a job of this process (another web worker runs it, or it finished
+        # before a restart): follow its persisted status transitions.
+        yield "retry: 3000\n\n"
+        last = None
+        idle = 0.0
+        while True:
+            state = await run_in_threadpool(jobs.get, job_id)
+            if state is None:
+                return
+            if state != last:
+                last, idle = state, 0.0
+                yield sse_event(state)
+                if state.get("status") in TERMINAL_STATES:
+                    return
+            elif idle >= HEARTBEAT_SECONDS:
+                if await request.is_disconnected():
+                    return
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(STORE_POLL_SECONDS)
+            idle += STORE_POLL_SECONDS
+
+    async def stream():
+        sub = bus.subscribe(job_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                state = await sub.get(HEARTBEAT_SECONDS)
+                if state is None:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_event(state)
+                if state.get("status") in TERMINAL_STATES:
+                    return
+        finally:
+            sub.close()
+
+    return StreamingResponse(
+        stream() if bus.get(job_id) is not None else poll_store(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,27 @@
+# backend/routes/library.py
+from __future__ import annotations
+from dataclasses import asdict
+from typing import Optional
+from fastapi import APIRouter
+from backend.services.sfx_library import CATALOG, library
+
+router = APIRouter()
+
+
+@router.get("/library")
+def list_library(tone: Optional[str] = None, tag: Optional[str] = None, duration: Optional[int] = None):
+    """Pre-rendered clips, filterable by tone, tag and duration."""
+    entries = library.entries(tone, tag, duration)
+    return {
+        "tones": sorted(CATALOG),
+        "stats": library.stats(),
+        "entries": [{**asdict(e), "url": f"/audio/{e.filename}"} for e in entries],
+    }
+
+
+@router.post("/library/warm", status_code=202)
+def warm_library():
+    """Render any missing library clips in the background."""
+    if not library.warming:
+        library.start_warmup(interval_s=0)
+    return {"ok": True, "stats": library.stats()}
@@ -5,11 +5,20 @@ import os
 import platform as pyplat
 import time
 from pathlib import Path
-from typing import Any, Dict
-from fastapi import APIRouter, Request
-from fastapi.responses import JSONResponse
-from backend.services.state import uptime_seconds, RECENT, dir_size_mb
-from backend.services import heavy_audiogen as heavy
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from backend.models.schemas import ProfileRequest
+from backend.services.state import uptime_seconds
+from backend.services.history import history
+from backend.services.storage import storage
+from backend.services.storage_layout import layout
+from backend.services import heavy_worker
+from backend.services.admission import controller as admission
+from backend.services import job_processor as jobs
+from backend.services.sfx_library import library
+from backend.services.singleflight import flights
+from backend.services.profiling import check_token, profiler
 
 router = APIRouter()
 APP_ROOT = Path(__file__).resolve().parents[2]
@@ -49,6 +58,7 @@ async def version(request: Request):
     git_sha = os.getenv("GIT_SHA")
     use_heavy = os.getenv("USE_HEAVY", "0")
     allow_fallback = os.getenv("ALLOW_FALLBACK", "1")
+    heavy = heavy_worker.backend()
 
     frontend_info: Dict[str, Any] = {}
     if BUILD_INFO.exists():
@@ -65,6 +75,9 @@ async def version(request: Request):
     except Exception:
         disk = None
 
+    # From the storage manifest: no directory walk.
+    audio_files, audio_bytes = layout.usage()
+
     # Retrieve last error lazily to avoid circular import
     try:
         from backend import main as _main  # type: ignore
@@ -103,13 +116,20 @@ async def version(request: Request):
         "libs": libs,
         "heavy": {
             "heavy_loaded": heavy.is_ready(),
+            "worker": heavy_worker.supervisor.snapshot(),
             "last_heavy_error": heavy.last_heavy_error(),
             "model_name": heavy.current_model_name(),
             "device": heavy.current_device(),
+            "optimizations": heavy.optimization_info(),
+            "conditioning_cache": heavy.conditioning_cache_stats(),
         },
+        "admission": admission.snapshot(),
+        "singleflight": flights.stats(),
+        "storage": storage.stats(),
         "last_error": last_error,
         "config": {
             "policy_default": "auto",
+            "generation_timeout_s": float(os.getenv("GENERATION_TIMEOUT_S", "300")),
             "audio_out_dir": str(OUTPUT_DIR),
             "cache_dir": os.getenv("HF_HOME") or os.getenv("TRANSFORMERS_CACHE") or None,
         },
@@ -121,9 +141,11 @@ async def version(request: Request):
             "uptime_seconds": uptime_seconds(),
             "routes_count": _routes_summary(request.app),
             "disk_free_gb": disk,
-            "audio_dir_size_mb": dir_size_mb(OUTPUT_DIR),
+            "audio_dir_size_mb": round(audio_bytes / (1024 * 1024), 3),
+            "audio_files": audio_files,
         },
-        "recent": list(RECENT),
+        "recent": history.recent(10),
+        "history": history.summary(),
     })
 
 
@@ -139,39 +161,97 @@ async def debug_routes(request: Request):
 
 @router.get("/api/debug/state")
 async def debug_state():
+    heavy = heavy_worker.backend()
     return {
         "heavy_ready": heavy.is_ready(),
         "last_heavy_error": heavy.last_heavy_error(),
         "model_name": heavy.current_model_name(),
         "device": heavy.current_device(),
-        "recent_generations": list(RECENT),
+        "admission": admission.snapshot(),
+        "worker": heavy_worker.supervisor.snapshot(),
+        "jobs": jobs.store().count_by_status(),
+        "library": library.stats(),
+        "singleflight": flights.stats(),
+        "storage": storage.stats(),
+        "recent_generations": history.recent(10),
+        "history": history.summary(),
     }
 
 
+@router.get("/api/debug/history")
+async def debug_history(limit: int = 50):
+    """Latency percentiles, error rates and throughput over the history ring, plus its newest records."""
+    return {**history.summary(), "recent": history.recent(max(1, min(limit, 1000)))}
+
+
+@router.post("/api/debug/profile", dependencies=[Depends(check_token)])
+async def start_profile(body: ProfileRequest):
+    """Profile the next `requests` generations, or those started within `seconds`."""
+    try:
+        run = profiler.start(body.mode, body.requests, body.seconds, body.interval_ms)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"ok": True, "run": run.describe()}
+
+
+@router.get("/api/debug/profile", dependencies=[Depends(check_token)])
+async def profile_status():
+    session = profiler.current()
+    return {"session": session.describe() if session else None, "runs": profiler.runs()}
+
+
+@router.delete("/api/debug/profile", dependencies=[Depends(check_token)])
+async def stop_profile():
+    run = profiler.stop()
+    return {"ok": True, "run": run.describe() if run else None}
+
+
+@router.get("/api/debug/profile/{run_id}", dependencies=[Depends(check_token)])
+async def profile_result(run_id: str, format: Optional[str] = None, sort: str = "cumulative", limit: int = 60):
+    """pstats text / raw pstats dump (cprofile runs) or collapsed stacks (sampling runs)."""
+    run = profiler.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="unknown profile run")
+    fmt = format or ("collapsed" if run.mode == "sampling" else "pstats")
+    try:
+        body = run.render(fmt, sort, limit)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media = "application/octet-stream" if fmt == "raw" else "text/plain; charset=utf-8"
+    return Response(body, media_type=media, headers={
+        "X-Profile-Profiled": str(run.profiled),
+        "X-Profile-Skipped": str(run.skipped),
+    })
+
+
 @router.post("/api/debug/selftest")
 async def debug_selftest():
     import numpy as np
-    # 2-second CPU-only compute to simulate heavy path without file IO
+    from backend.services import ambience
+    # 2-second CPU-only render through the procedural engine, without file IO
     t0 = time.time()
-    sr = 22050
-    seconds = 2
-    t = np.linspace(0, seconds, sr * seconds, endpoint=False)
-    y = np.sin(2 * np.pi * 440 * t) + 0.1 * np.random.default_rng(0).standard_normal(t.shape)
+    spec, seed = ambience.spec_for_prompt("selftest")
+    y = ambience.render(spec, 2, 22050, channels=2, seed=seed)
     elapsed = int((time.time() - t0) * 1000)
     return {"ok": True, "ms": elapsed, "rms": float(np.sqrt((y**2).mean()))}
 
 
 @router.get("/api/diag/verify-heavy")
 async def verify_heavy():
+    heavy = heavy_worker.backend()
     try:
-        ok = heavy.load_model()
+        if heavy_worker.enabled():
+            ok = heavy.load_model(wait_s=heavy_worker.LOAD_TIMEOUT_S)
+        else:
+            ok = heavy.load_model()
         if not ok:
             raise RuntimeError(f"load_model failed: {heavy.last_heavy_error()}")
-        data, sr = heavy.generate("creepy mechanical hallway", 1)
+        buf = heavy.generate("creepy mechanical hallway", 1)
         return {
             "ok": True,
-            "sample_rate": sr,
-            "bytes": len(data),
+            "sample_rate": buf.sample_rate,
+            "bytes": buf.nbytes,
+            "audio": buf.describe(),
             "device": heavy.current_device(),
             "model": heavy.current_model_name(),
         }
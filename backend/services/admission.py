@@ -0,0 +1,232 @@
+# backend/services/admission.py
+from __future__ import annotations
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+# Per-model memory model: (fixed MB per call, MB per second of audio).
+# The per-second term is dominated by the transformer KV cache, which grows
+# linearly with the number of generated tokens (and doubles under CFG).
+MODEL_COST_MB: Dict[str, Tuple[float, float]] = {
+    "facebook/audiogen-medium": (512.0, 60.0),
+}
+DEFAULT_COST_MB = (512.0, 60.0)
+RAM_FIXED_MB = 64.0
+RAM_PER_SECOND_MB = 1.0  # float32 buffers + encode copies at up to 48 kHz stereo
+
+
+class AdmissionRejected(Exception):
+    """Raised when a reservation cannot be granted within the wait budget."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class Reservation:
+    vram_mb: float
+    ram_mb: float
+    duration: float
+    started: float
+
+
+def _env_float(name: str) -> Optional[float]:
+    v = os.getenv(name)
+    try:
+        return float(v) if v else None
+    except ValueError:
+        return None
+
+
+def _detect_vram_budget_mb() -> float:
+    """Free CUDA memory (90% of it), or 0 on CPU."""
+    try:
+        import torch  # type: ignore
+        if torch.cuda.is_available():
+            free, _ = torch.cuda.mem_get_info()
+            return free / (1024 * 1024) * 0.9
+    except Exception:
+        pass
+    return 0.0
+
+
+def _detect_ram_budget_mb() -> float:
+    try:
+        pages = os.sysconf("SC_AVPHYS_PAGES")
+        page = os.sysconf("SC_PAGE_SIZE")
+        return pages * page / (1024 * 1024) * 0.5
+    except (ValueError, OSError, AttributeError):
+        return 4096.0
+
+
+class AdmissionController:
+    """Memory-budgeted admission for heavy generations.
+
+    Each call reserves an estimated VRAM/RAM cost for its lifetime. Calls that
+    would exceed the budget wait (FIFO-ish, bounded by `max_wait_s` and
+    `max_queue`) and are otherwise rejected with a Retry-After estimate derived
+    from observed throughput (seconds of audio rendered per wall second).
+    """
+
+    def __init__(
+        self,
+        vram_budget_mb: Optional[float] = None,
+        ram_budget_mb: Optional[float] = None,
+        max_wait_s: float = 30.0,
+        max_queue: int = 8,
+    ):
+        self._vram_budget = vram_budget_mb
+        self._ram_budget = ram_budget_mb
+        self._vram_configured = vram_budget_mb is not None
+        self._ram_configured = ram_budget_mb is not None
+        self._model_resident = False
+        self.max_wait_s = max_wait_s
+        self.max_queue = max_queue
+        self._cond = threading.Condition()
+        self._inflight: Dict[int, Reservation] = {}
+        self._queued_seconds = 0.0
+        self._waiting = 0
+        self._next_id = 0
+        self._throughput: Optional[float] = None  # audio seconds / wall second (EWMA)
+        self.admitted = 0
+        self.rejected = 0
+
+    # Unconfigured budgets are measured free memory, which only means something
+    # once the model's weights are resident: until model_loaded() they are
+    # re-measured on every read, afterwards measured once and kept.
+    @property
+    def vram_budget_mb(self) -> float:
+        if self._vram_budget is not None:
+            return self._vram_budget
+        budget = _detect_vram_budget_mb()
+        if self._model_resident:
+            self._vram_budget = budget
+        return budget
+
+    @property
+    def ram_budget_mb(self) -> float:
+        if self._ram_budget is not None:
+            return self._ram_budget
+        budget = _detect_ram_budget_mb()
+        if self._model_resident:
+            self._ram_budget = budget
+        return budget
+
+    def model_loaded(self) -> None:
+        """The heavy model is (re)loaded: measure unconfigured budgets afresh on next use."""
+        self._model_resident = True
+        if not self._vram_configured:
+            self._vram_budget = None
+        if not self._ram_configured:
+            self._ram_budget = None
+
+    def estimate(self, duration: float, model_name: Optional[str], on_gpu: bool) -> Tuple[float, float]:
+        """Return (vram_mb, ram_mb) for one generation of `duration` seconds."""
+        fixed, per_sec = MODEL_COST_MB.get(model_name or "", DEFAULT_COST_MB)
+        model_mb = fixed + per_sec * duration
+        ram_mb = RAM_FIXED_MB + RAM_PER_SECOND_MB * duration
+        if on_gpu:
+            return model_mb, ram_mb
+        # CPU inference keeps activations and KV cache in host memory.
+        return 0.0, ram_mb + model_mb
+
+    def _used(self) -> Tuple[float, float]:
+        vram = sum(r.vram_mb for r in self._inflight.values())
+        ram = sum(r.ram_mb for r in self._inflight.values())
+        return vram, ram
+
+    def _fits(self, vram_mb: float, ram_mb: float) -> bool:
+        used_vram, used_ram = self._used()
+        vram_ok = vram_mb == 0 or used_vram + vram_mb <= self.vram_budget_mb
+        ram_ok = used_ram + ram_mb <= self.ram_budget_mb
+        # An idle controller always admits one call so an over-estimate
+        # cannot wedge the service; a genuine OOM then surfaces as an error.
+        return (vram_ok and ram_ok) or not self._inflight
+
+    def retry_after(self, extra_seconds: float = 0.0) -> int:
+        """Seconds until the pending audio backlog should have drained."""
+        with self._cond:
+            return self._retry_after_locked(extra_seconds)
+
+    @contextmanager
+    def reserve(
+        self, duration: float, model_name: Optional[str], on_gpu: bool, peak_duration: Optional[float] = None
+    ) -> Iterator[Reservation]:
+        """`peak_duration` sizes the memory estimate when a render is windowed."""
+        vram_mb, ram_mb = self.estimate(duration if peak_duration is None else peak_duration, model_name, on_gpu)
+        deadline = time.monotonic() + self.max_wait_s
+        with self._cond:
+            if not self._fits(vram_mb, ram_mb) and self._waiting >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected("admission queue full", self._retry_after_locked(duration))
+            self._waiting += 1
+            self._queued_seconds += duration
+            try:
+                while not self._fits(vram_mb, ram_mb):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise AdmissionRejected("memory budget exhausted", self._retry_after_locked(0.0))
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+                self._queued_seconds -= duration
+            rid = self._next_id
+            self._next_id += 1
+            res = Reservation(vram_mb=vram_mb, ram_mb=ram_mb, duration=duration, started=time.monotonic())
+            self._inflight[rid] = res
+            self.admitted += 1
+        try:
+            yield res
+        finally:
+            with self._cond:
+                self._inflight.pop(rid, None)
+                self._cond.notify_all()
+
+    def _retry_after_locked(self, extra_seconds: float) -> int:
+        backlog = sum(r.duration for r in self._inflight.values()) + self._queued_seconds + extra_seconds
+        rate = self._throughput or 1.0
+        return max(1, int(math.ceil(backlog / rate)))
+
+    def observe(self, duration: float, elapsed_s: float, alpha: float = 0.2) -> None:
+        """Fold a completed generation into the throughput EWMA."""
+        if elapsed_s <= 0:
+            return
+        rate = duration / elapsed_s
+        with self._cond:
+            self._throughput = rate if self._throughput is None else (1 - alpha) * self._throughput + alpha * rate
+
+    def estimate_seconds(self, duration: float) -> Optional[float]:
+        """Expected wall time to render `duration` seconds, once throughput is known."""
+        with self._cond:
+            rate = self._throughput
+        return duration / rate if rate else None
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._cond:
+            used_vram, used_ram = self._used()
+            return {
+                "vram_budget_mb": round(self.vram_budget_mb, 1),
+                "ram_budget_mb": round(self.ram_budget_mb, 1),
+                "vram_reserved_mb": round(used_vram, 1),
+                "ram_reserved_mb": round(used_ram, 1),
+                "inflight": len(self._inflight),
+                "waiting": self._waiting,
+                "throughput_audio_s_per_s": round(self._throughput, 3) if self._throughput else None,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+            }
+
+
+controller = AdmissionController(
+    vram_budget_mb=_env_float("ADMISSION_VRAM_MB"),
+    ram_budget_mb=_env_float("ADMISSION_RAM_MB"),
+    max_wait_s=_env_float("ADMISSION_MAX_WAIT_S") or 30.0,
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "8")),
+)
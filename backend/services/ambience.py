@@ -0,0 +1,156 @@
+# backend/services/ambience.py
+"""Vectorized procedural ambience engine.
+
+A spec is a set of sine oscillators plus lowpassed noise layers, each with a
+stereo pan. Rendering walks the output in fixed-size blocks; within a block
+every oscillator is evaluated in one matrix product and every noise layer is
+shaped in one batched FFT, so there are no per-sample Python loops. Output is
+deterministic for a given (spec, seed, sample rate).
+"""
+from __future__ import annotations
+import hashlib
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+from backend.services.context import GenerationContext
+
+HOP = 2048           # noise overlap-add hop (segments are 2 * HOP long)
+BLOCK_HOPS = 32      # frames per render block = HOP * BLOCK_HOPS
+
+
+@dataclass(frozen=True)
+class Oscillator:
+    freq: float
+    gain: float
+    phase: float = 0.0
+    pan: float = 0.0  # -1 (left) .. 1 (right)
+
+
+@dataclass(frozen=True)
+class NoiseLayer:
+    gain: float
+    cutoff_hz: float | None = None  # one-pole lowpass; None = white
+    pan: float = 0.0
+
+
+@dataclass(frozen=True)
+class AmbienceSpec:
+    oscillators: Tuple[Oscillator, ...] = ()
+    noise: Tuple[NoiseLayer, ...] = ()
+    fade_ms: int = 40
+    peak: float | None = 0.95  # peak-normalize to this level; None keeps raw gains
+
+
+def db(gain_db: float) -> float:
+    return float(10 ** (gain_db / 20.0))
+
+
+def prompt_seed(prompt: str) -> int:
+    """Stable 32-bit seed for a prompt (unlike hash(), not salted per process)."""
+    return int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:4], "little")
+
+
+def spec_for_prompt(prompt: str) -> Tuple[AmbienceSpec, int]:
+    """Prompt-seeded pad: a root tone with sub/octave partials over filtered noise."""
+    seed = prompt_seed(prompt)
+    rng = np.random.default_rng(seed)
+    f = 110 + (seed % 300)  # 110–409 Hz
+    phases = rng.random(3) * 2 * np.pi
+    spec = AmbienceSpec(
+        oscillators=(
+            Oscillator(f, 0.6, phases[0], pan=-0.2),
+            Oscillator(0.5 * f, 0.3, phases[1], pan=0.0),
+            Oscillator(2 * f, 0.2, phases[2], pan=0.2),
+        ),
+        noise=(NoiseLayer(0.25, cutoff_hz=100.0 + (seed % 8) * 60.0),),
+        fade_ms=40,
+    )
+    return spec, seed
+
+
+def _pan_gains(pan: float, channels: int) -> np.ndarray:
+    if channels == 1:
+        return np.ones(1)
+    theta = (np.clip(pan, -1.0, 1.0) + 1.0) * np.pi / 4.0
+    lr = np.array([np.cos(theta), np.sin(theta)]) * np.sqrt(2.0)
+    return np.resize(lr, channels)
+
+
+def _noise_response(layers: Tuple[NoiseLayer, ...], sr: int) -> np.ndarray:
+    """|H| of each layer's one-pole lowpass on the segment FFT grid, unit RMS."""
+    freqs = np.fft.rfftfreq(2 * HOP, d=1.0 / sr)
+    cols = []
+    for layer in layers:
+        if layer.cutoff_hz is None:
+            h = np.ones_like(freqs)
+        else:
+            h = 1.0 / np.sqrt(1.0 + (freqs / max(layer.cutoff_hz, 1.0)) ** 2)
+        # two-sided mean power -> 1 so layer gain is the output RMS
+        power = (h[0] ** 2 + 2 * np.sum(h[1:-1] ** 2) + h[-1] ** 2) / (2 * HOP)
+        cols.append(h / np.sqrt(power))
+    return np.stack(cols, axis=1)  # (bins, layers)
+
+
+def render(
+    spec: AmbienceSpec,
+    seconds: float,
+    sr: int,
+    channels: int = 1,
+    seed: int = 0,
+    ctx: Optional[GenerationContext] = None,
+) -> np.ndarray:
+    """Render `spec` to float32 of shape (frames,) for mono or (frames, channels).
+
+    `ctx` receives per-block progress and can cancel between blocks.
+    """
+    total = int(round(seconds * sr))
+    out = np.zeros((total, channels), dtype=np.float32)
+    if total == 0:
+        return out[:, 0] if channels == 1 else out
+
+    osc = spec.oscillators
+    if osc:
+        w = 2 * np.pi * np.array([o.freq for o in osc]) / sr
+        ph = np.array([o.phase for o in osc])
+        w32 = w.astype(np.float32)
+        osc_mix = np.stack([o.gain * _pan_gains(o.pan, channels) for o in osc]).astype(np.float32)  # (k, ch)
+
+    layers = spec.noise
+    if layers:
+        h = _noise_response(layers, sr)[None, :, :, None]                         # (1, bins, L, 1)
+        noise_mix = np.stack([l.gain * _pan_gains(l.pan, channels) for l in layers])  # (L, ch)
+        # sqrt-Hann at 50% overlap: squared windows sum to 1, so variance is flat
+        window = np.sqrt(0.5 - 0.5 * np.cos(2 * np.pi * np.arange(2 * HOP) / (2 * HOP)))
+        carry = np.zeros((HOP, channels))
+
+    block = HOP * BLOCK_HOPS
+    for b, start in enumerate(range(0, total, block)):
+        n = min(block, total - start)
+        if osc:
+            # wrap the block's start phase in float64, then stay in float32
+            phase0 = ((start * w + ph) % (2 * np.pi)).astype(np.float32)
+            local = np.arange(n, dtype=np.float32)[:, None] * w32 + phase0
+            out[start:start + n] += np.sin(local, out=local) @ osc_mix
+        if layers:
+            m = -(-n // HOP)
+            rng = np.random.default_rng([seed, b])
+            white = rng.standard_normal((m, 2 * HOP, len(layers), channels), dtype=np.float32)
+            seg = np.fft.irfft(np.fft.rfft(white, axis=1) * h, n=2 * HOP, axis=1)
+            seg = np.einsum("msLc,Lc->msc", seg, noise_mix) * window[None, :, None]
+            ola = np.zeros(((m + 1) * HOP, channels))
+            ola[:HOP] += carry
+            ola[:m * HOP] += seg[:, :HOP].reshape(m * HOP, channels)
+            ola[HOP:] += seg[:, HOP:].reshape(m * HOP, channels)
+            out[start:start + n] += ola[:n].astype(np.float32)
+            carry = ola[m * HOP:]
+        if ctx is not None:
+            ctx.report((start + n) / total)
+
+    if spec.peak is not None:
+        out *= spec.peak / (float(np.max(np.abs(out))) + 1e-9)
+    fl = min(max(1, int(sr * spec.fade_ms / 1000)), total // 2 or 1)
+    ramp = np.linspace(0.0, 1.0, fl, dtype=np.float32)[:, None]
+    out[:fl] *= ramp
+    out[total - fl:] *= ramp[::-1]
+    return out[:, 0] if channels == 1 else out
@@ -0,0 +1,91 @@
+# backend/services/audio_buffer.py
+"""Typed audio handoff between generators and the WAV encoder.
+
+An AudioBuffer is a channels-last float32 view plus its sample rate. Built
+from a model tensor it shares the tensor's memory (no `.tobytes()` /
+`frombuffer` round-trip), and it is written in blocks, so the only
+per-sample copy is libsndfile's own int16 conversion of each block.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Tuple, Union
+
+import numpy as np
+
+WRITE_BLOCK_FRAMES = 1 << 16
+
+
+@dataclass(frozen=True)
+class AudioBuffer:
+    data: np.ndarray  # (frames, channels), float32; may be a strided view
+    sample_rate: int
+
+    @classmethod
+    def from_array(cls, data: np.ndarray, sample_rate: int) -> "AudioBuffer":
+        """Wrap (frames,) or (frames, channels) samples; float32 input is not copied."""
+        arr = np.asarray(data, dtype=np.float32)
+        if arr.ndim == 1:
+            arr = arr[:, None]
+        if arr.ndim != 2:
+            raise ValueError(f"expected (frames[, channels]) audio, got shape {arr.shape}")
+        return cls(arr, int(sample_rate))
+
+    @classmethod
+    def from_tensor(cls, wav: Any, sample_rate: int) -> "AudioBuffer":
+        """Wrap a channels-first torch tensor, [C, T] or [1, C, T].
+
+        `.cpu()`, `.float()` and `.numpy()` are no-ops on a CPU float32
+        tensor, so the buffer aliases the tensor's storage; transposing to
+        channels-last is a view.
+        """
+        wav = wav.detach()
+        if wav.dim() == 3:
+            wav = wav.squeeze(0)
+        if wav.dim() == 1:
+            wav = wav.unsqueeze(0)
+        return cls(wav.cpu().float().numpy().T, int(sample_rate))
+
+    @property
+    def frames(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def channels(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.data.shape  # type: ignore[return-value]
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.data.dtype
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    @property
+    def duration_s(self) -> float:
+        return self.frames / self.sample_rate
+
+    def __array__(self, dtype=None, copy=None):
+        return self.data if dtype is None else self.data.astype(dtype)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "frames": self.frames,
+            "channels": self.channels,
+            "sample_rate": self.sample_rate,
+            "dtype": str(self.dtype),
+            "duration_s": round(self.duration_s, 3),
+        }
+
+    def write(self, path: Union[str, Path], subtype: str = "PCM_16") -> Path:
+        """Encode to WAV block by block (each block is made contiguous on its own)."""
+        import soundfile as sf
+        with sf.SoundFile(str(path), "w", self.sample_rate, self.channels, subtype=subtype, format="WAV") as f:
+            for start in range(0, self.frames, WRITE_BLOCK_FRAMES):
+                f.write(self.data[start:start + WRITE_BLOCK_FRAMES])
+        return Path(path)
@@ -0,0 +1,57 @@
+# backend/services/context.py
+"""Per-generation context: progress reporting and cooperative cancellation.
+
+Generators call `ctx.report(fraction)` at natural checkpoints (per render
+block, per decoding step). Reporting doubles as the cancellation point: once
+`cancel()` has been called the next report raises GenerationCancelled, which
+unwinds the generator and releases its CPU/GPU resources. Likewise, once the
+optional `deadline` (epoch seconds) has passed it raises GenerationTimeout.
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Optional
+
+ProgressFn = Callable[[float], None]
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a generator when its context has been canceled."""
+
+
+class GenerationTimeout(Exception):
+    """Raised inside a generator when its context's deadline has passed."""
+
+
+class GenerationContext:
+    def __init__(self, on_progress: Optional[ProgressFn] = None, min_interval: float = 0.1):
+        self._on_progress = on_progress
+        self._cancel = threading.Event()
+        self._min_interval = min_interval
+        self._last_emit = 0.0
+        self.progress = 0.0
+        self.deadline: Optional[float] = None
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self) -> None:
+        if self._cancel.is_set():
+            raise GenerationCancelled("generation canceled")
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise GenerationTimeout("generation exceeded its deadline")
+
+    def report(self, fraction: float) -> None:
+        """Record progress in [0, 1] (throttled to the listener) and honour cancel."""
+        self.check()
+        self.progress = min(1.0, max(self.progress, float(fraction)))
+        if self._on_progress is None:
+            return
+        now = time.monotonic()
+        if self.progress >= 1.0 or now - self._last_emit >= self._min_interval:
+            self._last_emit = now
+            self._on_progress(self.progress)
@@ -0,0 +1,137 @@
+# backend/services/file_serving.py
+"""Cache-friendly file responses for generated audio.
+
+Generated files are write-once, so they are served with a content-hash ETag
+and `immutable` caching. Conditional requests (`If-None-Match`) short-circuit
+to 304, and single byte ranges are streamed straight from the file so players
+can seek without downloading the whole clip.
+"""
+from __future__ import annotations
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+CHUNK_SIZE = 256 * 1024
+_ETAG_CACHE_MAX = 4096
+
+_etags: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_etags_lock = threading.Lock()
+
+
+def content_etag(path: Path, st: Optional[os.stat_result] = None) -> str:
+    """Strong ETag from a BLAKE2b digest of the file contents.
+
+    Digests are memoized per (path, size, mtime) so each file is hashed once.
+    """
+    st = st or path.stat()
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    with _etags_lock:
+        tag = _etags.get(key)
+        if tag is not None:
+            _etags.move_to_end(key)
+            return tag
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    tag = f'"{h.hexdigest()}"'
+    with _etags_lock:
+        _etags[key] = tag
+        while len(_etags) > _ETAG_CACHE_MAX:
+            _etags.popitem(last=False)
+    return tag
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # weak comparison, as If-None-Match requires
+    candidates = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return etag in candidates
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range into inclusive (start, end).
+
+    Returns None for anything we choose not to honour (multi-range, other
+    units, malformed), in which case the full body is sent. Raises ValueError
+    for a syntactically valid but unsatisfiable range.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        start = int(first) if first else None
+        end = int(last) if last else None
+    except ValueError:
+        return None
+    if start is None:
+        if end is None:
+            return None
+        if end == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - end), size - 1
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+def _iter_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    remaining = end - start + 1
+    with open(path, "rb") as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_response(
+    request: Request,
+    path: Path,
+    media_type: Optional[str] = None,
+    download_name: Optional[str] = None,
+) -> Response:
+    """Serve `path` with ETag, immutable caching, 304s and byte ranges."""
+    st = path.stat()
+    etag = content_etag(path, st)
+    media_type = media_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if download_name:
+        headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+
+    inm = request.headers.get("if-none-match")
+    if inm is not None and _etag_matches(inm, etag):
+        return Response(status_code=304, headers=headers)
+
+    rng = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if rng and (if_range is None or if_range.strip() == etag):
+        try:
+            span = _parse_range(rng, st.st_size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{st.st_size}"})
+        if span is not None:
+            start, end = span
+            headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+            headers["Content-Length"] = str(end - start + 1)
+            if request.method == "HEAD":
+                return Response(status_code=206, headers=headers, media_type=media_type)
+            return StreamingResponse(_iter_range(path, start, end), status_code=206, headers=headers, media_type=media_type)
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=st)
@@ -1,53 +1,35 @@
 # backend/services/generate.py
-import uuid
 from pathlib import Path
 import numpy as np
 import soundfile as sf
+from backend.services import ambience
+from backend.services.context import GenerationContext
+from backend.services.storage_layout import layout_for
 
 DEFAULT_SAMPLE_RATE = 44100
 
 
-def _fade(signal: np.ndarray, sr: int, ms: int = 30) -> np.ndarray:
-    n = len(signal)
-    fl = max(1, int(sr * ms / 1000))
-    env_in = np.linspace(0, 1, fl)
-    env_out = np.linspace(1, 0, fl)
-    y = signal.copy()
-    y[:fl] *= env_in
-    y[-fl:] *= env_out
-    return y
+def _procedural(
+    prompt: str, seconds: int, sr: int, ctx: GenerationContext | None = None, variation: int = 0
+) -> np.ndarray:
+    spec, seed = ambience.spec_for_prompt(prompt)
+    return ambience.render(spec, seconds, sr, channels=1, seed=seed + variation, ctx=ctx)
 
 
-def _procedural(prompt: str, seconds: int, sr: int) -> np.ndarray:
-    n = seconds * sr
-    t = np.linspace(0, seconds, n, endpoint=False)
-    seed = abs(hash(prompt)) % (2**32)
-    rng = np.random.default_rng(seed)
-    f = 110 + (seed % 300)  # 110–409 Hz
-    pad = (
-        0.6 * np.sin(2 * np.pi * f * t + rng.random())
-        + 0.3 * np.sin(2 * np.pi * 0.5 * f * t + rng.random())
-        + 0.2 * np.sin(2 * np.pi * 2 * f * t + rng.random())
-    )
-    # lowpassed noise texture
-    noise = rng.standard_normal(n).astype(np.float32)
-    alpha = 0.02 + (seed % 8) / 100.0
-    filt = np.zeros_like(noise, dtype=np.float32)
-    acc = 0.0
-    for i in range(n):
-        acc = alpha * noise[i] + (1 - alpha) * acc
-        filt[i] = acc
-    y = pad + 0.25 * filt
-    y = _fade(y / (np.max(np.abs(y)) + 1e-9), sr=sr, ms=40)
-    return y.astype(np.float32)
+def generate_file(
+    prompt: str,
+    duration: int,
+    output_dir: Path,
+    sample_rate: int | None = None,
+    ctx: GenerationContext | None = None,
+    variation: int = 0,
+) -> Path:
+    """Generate a deterministic procedural WAV file.
 
-
-def generate_file(prompt: str, duration: int, output_dir: Path, sample_rate: int | None = None) -> Path:
-    """Generate a deterministic procedural WAV file."""
+    `variation` picks a different noise seed for the same prompt.
+    """
     sr = int(sample_rate or DEFAULT_SAMPLE_RATE)
-    output_dir.mkdir(parents=True, exist_ok=True)
-    audio = _procedural(prompt.strip(), duration, sr)
-    file_id = str(uuid.uuid4())
-    out_path = output_dir / f"{file_id}.wav"
+    audio = _procedural(prompt.strip(), duration, sr, ctx, variation)
+    out_path = layout_for(output_dir).new_path(".wav")
     sf.write(out_path, audio, sr, subtype="PCM_16")
     return out_path
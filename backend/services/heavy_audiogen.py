@@ -1,13 +1,153 @@
 # backend/services/heavy_audiogen.py
 from __future__ import annotations
+import math
 import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+from backend.services.admission import controller as admission
+from backend.services.audio_buffer import AudioBuffer
+from backend.services.context import GenerationCancelled, GenerationContext
+from backend.services.resample import StreamResampler, resample_buffer
+from backend.services import weights
+
+# Inference optimizations, applied once at load time.
+PRECISION = os.getenv("HEAVY_PRECISION", "auto").lower()  # auto | fp32 | fp16 | bf16
+INFERENCE_MODE = os.getenv("HEAVY_INFERENCE_MODE", "1") == "1"
+COMPILE = os.getenv("HEAVY_COMPILE", "0") == "1"
+QUANTIZE = os.getenv("HEAVY_QUANTIZE", "0") == "1"  # dynamic int8, CPU only
+COND_CACHE_MB = float(os.getenv("HEAVY_COND_CACHE_MB", "64"))
+
+# Long-form: durations above LONGFORM_MIN_S render in WINDOW_S windows.
+LONGFORM_MIN_S = float(os.getenv("HEAVY_LONGFORM_MIN_S", "30"))
+WINDOW_S = float(os.getenv("HEAVY_WINDOW_S", "10"))
+CONTEXT_S = float(os.getenv("HEAVY_CONTEXT_S", "3"))  # tail of a window fed to the next as its prompt
+SEAM_S = float(os.getenv("HEAVY_SEAM_S", "0.5"))  # crossfade at each seam (<= CONTEXT_S)
 
 _last_error: Optional[str] = None
 _model = None
 _model_name: Optional[str] = None
 _device = "cpu"
+# AudioGen holds a single progress callback; route it to the calling thread's context.
+_tls = threading.local()
+_opt_info: Dict[str, Any] = {}
+# Generation parameters (duration) live on the shared model, so setting them
+# and generating must not interleave: in-process calls run one at a time.
+_model_lock = threading.Lock()
+
+
+class ConditioningCache:
+    """LRU of text-conditioner outputs, bounded by tensor bytes.
+
+    Keys are the batch's whitespace-normalized prompts (None for the
+    classifier-free-guidance null condition); values are the (embeds, mask)
+    pair the conditioner returned, left on the model's device.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: tuple, value, nbytes: int) -> None:
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+_cond_cache = ConditioningCache(int(COND_CACHE_MB * 1024 * 1024))
+
+
+def _normalize_prompt(text: Optional[str]) -> Optional[str]:
+    # The T5 tokenizer ignores runs of whitespace, so this never changes the embedding.
+    return " ".join(text.split()) if text else None
+
+
+def _tensor_bytes(t) -> int:
+    return t.element_size() * t.nelement()
+
+
+def _install_conditioning_cache(m) -> bool:
+    """Memoize the text conditioner of a loaded AudioGen. Returns False if absent."""
+    provider = getattr(m.lm, "condition_provider", None)
+    conditioner = getattr(provider, "conditioners", {}).get("description")
+    if conditioner is None or not hasattr(conditioner, "tokenize"):
+        return False
+    tokenize, forward = conditioner.tokenize, conditioner.forward
+
+    def cached_tokenize(texts):
+        inputs = tokenize(texts)
+        try:
+            # tokenize() and forward() run back to back; tag the batch with its key.
+            inputs._cond_key = tuple(_normalize_prompt(t) for t in texts)
+        except AttributeError:
+            pass
+        return inputs
+
+    def cached_forward(inputs):
+        key = getattr(inputs, "_cond_key", None)
+        if key is None or _cond_cache.max_bytes <= 0:
+            return forward(inputs)
+        hit = _cond_cache.get(key)
+        if hit is not None:
+            return hit
+        embeds, mask = forward(inputs)
+        _cond_cache.put(key, (embeds, mask), _tensor_bytes(embeds) + _tensor_bytes(mask))
+        return embeds, mask
+
+    conditioner.tokenize = cached_tokenize
+    conditioner.forward = cached_forward
+    return True
+
+
+def conditioning_cache_stats() -> Dict[str, Any]:
+    return _cond_cache.stats()
+
 
 @dataclass
 class HeavyInfo:
@@ -43,8 +183,83 @@ def current_model_name() -> Optional[str]:
     return _model_name
 
 
+def optimization_info() -> Dict[str, Any]:
+    """What was requested vs. applied for each inference optimization."""
+    return dict(_opt_info) or {
+        "precision": PRECISION,
+        "inference_mode": INFERENCE_MODE,
+        "compile": COMPILE,
+        "quantize": QUANTIZE,
+        "applied": False,
+    }
+
+
+def _resolve_precision(torch, device: str):
+    """Map HEAVY_PRECISION to an autocast dtype (None means plain fp32)."""
+    p = PRECISION
+    if p == "auto":
+        # AudioGen's own default: fp16 autocast on GPU, fp32 on CPU.
+        p = "fp16" if device == "cuda" else "fp32"
+    if p == "fp16" and device == "cpu":
+        p = "bf16"  # CPU autocast only supports bfloat16
+    if p == "bf16" and device == "cuda" and not torch.cuda.is_bf16_supported():
+        p = "fp16"
+    return p, {"fp16": torch.float16, "bf16": torch.bfloat16}.get(p)
+
+
+def _optimize(m, torch, device: str) -> Dict[str, Any]:
+    """Apply precision/quantization/compile settings to a loaded AudioGen."""
+    info: Dict[str, Any] = {"inference_mode": INFERENCE_MODE, "applied": True}
+    quantized = False
+    if QUANTIZE:
+        if device == "cpu":
+            try:
+                m.lm = torch.ao.quantization.quantize_dynamic(m.lm, {torch.nn.Linear}, dtype=torch.qint8)
+                quantized = True
+            except Exception as e:  # noqa: BLE001
+                info["quantize_error"] = str(e)
+        else:
+            info["quantize_error"] = "dynamic int8 quantization is CPU-only"
+    info["quantize"] = quantized
+
+    precision, dtype = _resolve_precision(torch, device)
+    if quantized:
+        precision, dtype = "fp32", None  # int8 kernels run outside autocast
+    try:
+        from audiocraft.utils.autocast import TorchAutocast  # type: ignore
+        if dtype is None:
+            m.autocast = TorchAutocast(enabled=False)
+        else:
+            m.autocast = TorchAutocast(enabled=True, device_type=device, dtype=dtype)
+        info["precision"] = precision
+    except Exception as e:  # noqa: BLE001
+        info["precision"] = "default"
+        info["precision_error"] = str(e)
+
+    compiled = False
+    if COMPILE:
+        try:
+            # The LM's sampling loop is Python; compile the transformer it steps.
+            m.lm.transformer = torch.compile(m.lm.transformer, dynamic=True)
+            compiled = True
+        except Exception as e:  # noqa: BLE001
+            info["compile_error"] = str(e)
+    info["compile"] = compiled
+    return info
+
+
+def _load_weights(AudioGen, model_name: str):
+    """HEAVY_WEIGHTS=mmap maps shared safetensors; otherwise (or if that fails) unpickle from the hub cache."""
+    if weights.enabled():
+        try:
+            return weights.load_audiogen(model_name)
+        except Exception as e:  # noqa: BLE001
+            weights.record_fallback(e)
+    return AudioGen.get_pretrained(model_name)
+
+
 def load_model(model_name: str = "facebook/audiogen-medium") -> bool:
-    global _model, _last_error, _device, _model_name
+    global _model, _last_error, _device, _model_name, _opt_info
     if _model is not None:
         return True
     torch, AudioGen = _try_imports()
@@ -54,12 +269,17 @@ def load_model(model_name: str = "facebook/audiogen-medium") -> bool:
     try:
         cuda = torch.cuda.is_available()
         _device = "cuda" if cuda else "cpu"
-        m = AudioGen.get_pretrained(model_name)
+        m = _load_weights(AudioGen, model_name)
         if cuda:
             m = m.to("cuda")
+        _opt_info = _optimize(m, torch, _device)
+        _opt_info["conditioning_cache"] = _install_conditioning_cache(m)
+        _opt_info["weights"] = weights.info()
+        m.set_custom_progress_callback(_on_tokens)
         _model = m
         _model_name = model_name
         _last_error = None
+        admission.model_loaded()  # free memory is only meaningful with the weights resident
         return True
     except Exception as e:  # noqa: BLE001
         _last_error = str(e)
@@ -67,25 +287,166 @@ def load_model(model_name: str = "facebook/audiogen-medium") -> bool:
         return False
 
 
-def generate(prompt: str, seconds: int, sample_rate: int | None = None) -> tuple[bytes, int]:
-    """Generate raw float32 audio bytes and sample_rate.
-    Note: We return CPU numpy bytes to avoid torch dependency at call site.
+def _on_tokens(generated: int, total: int) -> None:
+    ctx = getattr(_tls, "ctx", None)
+    if ctx is not None and total:
+        # raising here aborts the decoding loop mid-sequence
+        ctx.report(generated / total)
+
+
+@contextmanager
+def _model_turn(ctx: GenerationContext | None) -> Iterator[None]:
+    """Hold the model for one set_generation_params + generate pair.
+
+    While waiting, `ctx` is still checked, so a queued call honours cancel and its deadline.
+    """
+    while not _model_lock.acquire(timeout=0.25):
+        if ctx is not None:
+            ctx.check()
+    try:
+        yield
+    finally:
+        _model_lock.release()
+
+
+def generate(
+    prompt: str,
+    seconds: int,
+    sample_rate: int | None = None,
+    ctx: GenerationContext | None = None,
+) -> AudioBuffer:
+    """Generate audio as a channels-last float32 AudioBuffer at `sample_rate`
+    (or the model's native rate when None).
+    Note: The buffer aliases the CPU copy of the model output, so callers need no torch.
+    `ctx` receives per-token-step progress and can cancel mid-generation.
     """
     global _last_error
     if _model is None:
         raise RuntimeError("heavy model not loaded")
+    _tls.ctx = ctx
     try:
         # defer imports to runtime context
         import torch
-        import numpy as np
-        _model.set_generation_params(duration=seconds)
-        wavs = _model.generate([prompt])  # [B, C, T]
-        wav = wavs[0].detach().to("cpu")
-        if wav.dim() == 3:
-            wav = wav.squeeze(0)
+        if ctx is not None:
+            ctx.check()
+        # progress=True makes AudioGen invoke the custom callback per token step
+        with _model_turn(ctx), torch.inference_mode(INFERENCE_MODE):
+            _model.set_generation_params(duration=seconds)
+            wavs = _model.generate([prompt], progress=ctx is not None)  # [B, C, T]
         sr = getattr(_model.compression_model.cfg, "sample_rate", 44100)
-        arr = wav.numpy()
-        return arr.tobytes(), int(sr)
+        buf = AudioBuffer.from_tensor(wavs[0], sr)
+        if sample_rate and sample_rate != buf.sample_rate:
+            # AudioGen decodes at 16 kHz; convert rather than returning the native rate.
+            buf = resample_buffer(buf, sample_rate)
+        return buf
+    except GenerationCancelled:
+        _release_cuda_cache()
+        raise
     except Exception as e:  # noqa: BLE001
         _last_error = str(e)
-        raise
\ No newline at end of file
+        raise
+    finally:
+        _tls.ctx = None
+
+
+def _window_ctx(ctx: GenerationContext | None, index: int, count: int) -> GenerationContext | None:
+    """Per-window context whose progress maps into the whole render's [0, 1]."""
+    if ctx is None:
+        return None
+    return GenerationContext(lambda f: ctx.report((index + f) / count), min_interval=0.0)
+
+
+def generate_long(
+    prompt: str,
+    seconds: float,
+    out_path: str,
+    sample_rate: int | None = None,
+    ctx: GenerationContext | None = None,
+) -> int:
+    """Render `seconds` of audio in overlapping windows straight into a WAV.
+
+    The first window is a plain generation of WINDOW_S; each later one is a
+    continuation of the previous window's last CONTEXT_S, so it picks up the
+    same texture, and contributes WINDOW_S - CONTEXT_S of new audio. The
+    continuation re-decodes its prompt, and the last SEAM_S of that
+    reconstruction is linearly crossfaded with the previous window's
+    tail. Each window is streamed to the file (through a seamless streaming
+    resampler when `sample_rate` differs) before the next starts, so peak
+    memory is set by WINDOW_S, not by `seconds`. Returns the file's rate.
+    """
+    global _last_error
+    if _model is None:
+        raise RuntimeError("heavy model not loaded")
+    import soundfile as sf
+    import torch
+
+    sr = getattr(_model.compression_model.cfg, "sample_rate", 44100)
+    out_sr = int(sample_rate or sr)
+    total = int(round(seconds * sr))
+    step = WINDOW_S - CONTEXT_S
+    count = 1 + max(0, math.ceil((seconds - WINDOW_S) / step))
+    ctx_frames = int(CONTEXT_S * sr)
+    seam = min(int(SEAM_S * sr), ctx_frames)
+    produced = 0  # frames of the timeline decided so far (written + held)
+    held = None  # last `seam` frames, kept back for the next crossfade
+    tail = None  # last CONTEXT_S of the previous window, on the model's device
+    f = resampler = None
+    try:
+        for i in range(count):
+            if ctx is not None:
+                ctx.check()
+            _tls.ctx = _window_ctx(ctx, i, count)
+            # The model is held per window, so concurrent renders interleave between windows.
+            with _model_turn(ctx), torch.inference_mode(INFERENCE_MODE):
+                if tail is None:
+                    _model.set_generation_params(duration=min(WINDOW_S, seconds))
+                    wav = _model.generate([prompt], progress=ctx is not None)[0]
+                    prompt_len = 0
+                else:
+                    new_s = min(step, (total - produced) / sr)
+                    _model.set_generation_params(duration=tail.shape[-1] / sr + new_s)
+                    wav = _model.generate_continuation(tail, sr, [prompt], progress=ctx is not None)[0]
+                    prompt_len = tail.shape[-1]
+                tail = wav[None, :, -ctx_frames:].clone()
+            audio = AudioBuffer.from_tensor(wav, sr).data
+            del wav
+            new = audio[prompt_len:prompt_len + (total - produced)]
+            if f is None:
+                f = sf.SoundFile(str(out_path), "w", out_sr, audio.shape[1], subtype="PCM_16", format="WAV")
+                resampler = StreamResampler(sr, out_sr, audio.shape[1])
+            chunks = []
+            if held is not None and len(held):
+                # The reconstruction is the same audio re-encoded (correlated), so fade linearly.
+                fade_in = ((np.arange(len(held), dtype=np.float32) + 0.5) / len(held))[:, None]
+                recon = audio[prompt_len - len(held):prompt_len]
+                chunks.append(held + (recon - held) * fade_in)
+            produced += len(new)
+            last = i == count - 1 or produced >= total
+            cut = len(new) if last else max(0, len(new) - seam)
+            chunks.append(new[:cut])
+            held = None if last else new[cut:].copy()
+            for chunk in chunks:
+                f.write(resampler.push(chunk))
+            if last:
+                break
+        f.write(resampler.flush())
+        return out_sr
+    except GenerationCancelled:
+        _release_cuda_cache()
+        raise
+    except Exception as e:  # noqa: BLE001
+        _last_error = str(e)
+        raise
+    finally:
+        _tls.ctx = None
+        if f is not None:
+            f.close()
+
+
+def _release_cuda_cache() -> None:
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
\ No newline at end of file
@@ -0,0 +1,275 @@
+# backend/services/heavy_worker.py
+"""Supervised out-of-process heavy inference.
+
+With HEAVY_ISOLATION=process, AudioGen runs in a child process that the API
+process supervises over a pipe. A call that overruns its deadline is
+preempted by killing the child; a replacement is spawned immediately and
+starts loading the model from the shared on-disk cache while the caller falls
+back. Cancellation is cooperative: the child polls the pipe at every token
+step and stops when asked.
+"""
+from __future__ import annotations
+import logging
+import multiprocessing as mp
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from backend.services.admission import controller as admission
+from backend.services.audio_buffer import AudioBuffer
+from backend.services.context import GenerationCancelled, GenerationContext
+
+ISOLATION = os.getenv("HEAVY_ISOLATION", "inline")  # "inline" | "process"
+LOAD_TIMEOUT_S = float(os.getenv("HEAVY_LOAD_TIMEOUT_S", "600"))
+CANCEL_GRACE_S = 5.0
+
+_log = logging.getLogger("uvicorn.error")
+
+
+class HeavyTimeout(RuntimeError):
+    """The heavy call missed its deadline and the worker was restarted."""
+
+
+def enabled() -> bool:
+    return ISOLATION == "process"
+
+
+def _child_main(conn, model_name: str) -> None:
+    """Worker process: load once, then serve generate requests until killed."""
+    from backend.services import heavy_audiogen as heavy
+
+    ok = heavy.load_model(model_name)
+    conn.send(("ready", ok, heavy.current_device(), heavy.last_heavy_error(), heavy.optimization_info()))
+    if not ok:
+        return
+    while True:
+        msg = conn.recv()
+        if msg[0] != "generate":
+            continue  # stale cancel for a finished request
+        _, req_id, prompt, seconds, sample_rate, out_path = msg
+
+        def on_progress(frac: float, req_id=req_id) -> None:
+            conn.send(("progress", req_id, frac))
+
+        ctx = GenerationContext(on_progress)
+
+        def poll_cancel(frac: float, report=ctx.report) -> None:
+            while conn.poll():
+                m = conn.recv()
+                if m[0] == "cancel" and m[1] == req_id:
+                    ctx.cancel()
+            report(frac)
+
+        ctx.report = poll_cancel  # type: ignore[method-assign]
+        try:
+            if out_path is None:
+                result = heavy.generate(prompt, seconds, sample_rate, ctx)
+            else:
+                result = heavy.generate_long(prompt, seconds, out_path, sample_rate, ctx)
+            conn.send(("ok", req_id, result, heavy.conditioning_cache_stats()))
+        except GenerationCancelled:
+            conn.send(("canceled", req_id))
+        except Exception as e:  # noqa: BLE001
+            conn.send(("error", req_id, str(e)))
+
+
+class HeavySupervisor:
+    """Owns one worker process and serializes calls to it."""
+
+    def __init__(self, model_name: str = "facebook/audiogen-medium"):
+        self.model_name = model_name
+        self._mp = mp.get_context("spawn")
+        self._proc = None
+        self._conn = None
+        self._ready = threading.Event()
+        self._device = "cpu"
+        self._last_error: Optional[str] = None
+        self._opt_info: Dict[str, Any] = {}
+        self._cond_stats: Dict[str, Any] = {}
+        self._call_lock = threading.Lock()
+        self._spawn_lock = threading.Lock()
+        self._req_id = 0
+        self.restarts = 0
+        self.timeouts = 0
+
+    # Lifecycle ---------------------------------------------------------------
+
+    def _spawn(self) -> None:
+        with self._spawn_lock:
+            if self._proc is not None and self._proc.is_alive():
+                return
+            self._ready.clear()
+            parent, child = self._mp.Pipe()
+            proc = self._mp.Process(target=_child_main, args=(child, self.model_name), name="heavy-worker", daemon=True)
+            proc.start()
+            child.close()
+            self._proc, self._conn = proc, parent
+            threading.Thread(target=self._await_ready, args=(parent,), name="heavy-worker-load", daemon=True).start()
+
+    def _await_ready(self, conn) -> None:
+        try:
+            if not conn.poll(LOAD_TIMEOUT_S):
+                self._last_error = "heavy worker load timed out"
+                return
+            _, ok, device, err, opt_info = conn.recv()
+        except (EOFError, OSError) as e:
+            if conn is self._conn:  # not a worker we killed on purpose
+                self._last_error = f"heavy worker died during load: {e}"
+            return
+        self._device = device
+        self._last_error = err
+        self._opt_info = opt_info
+        if ok:
+            admission.model_loaded()  # the worker's weights now count against free device memory
+            self._ready.set()
+
+    def _kill(self) -> None:
+        with self._spawn_lock:
+            proc, conn = self._proc, self._conn
+            self._proc = self._conn = None
+            self._ready.clear()
+        if proc is not None:
+            proc.kill()
+            proc.join(timeout=5)
+        if conn is not None:
+            conn.close()
+
+    def restart(self) -> None:
+        """Kill the worker and immediately start warming a replacement."""
+        self._kill()
+        self.restarts += 1
+        self._spawn()
+
+    def shutdown(self) -> None:
+        self._kill()
+
+    def snapshot(self) -> Dict[str, object]:
+        proc = self._proc
+        return {
+            "isolation": ISOLATION,
+            "pid": proc.pid if proc is not None and proc.is_alive() else None,
+            "ready": self.is_ready(),
+            "restarts": self.restarts,
+            "timeouts": self.timeouts,
+        }
+
+    # heavy_audiogen-compatible surface ---------------------------------------
+
+    def load_model(self, wait_s: float = 0.0) -> bool:
+        self._spawn()
+        return self._ready.wait(wait_s) if wait_s > 0 else self._ready.is_set()
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set() and self._proc is not None and self._proc.is_alive()
+
+    def last_heavy_error(self) -> Optional[str]:
+        return self._last_error
+
+    def current_device(self) -> str:
+        return self._device
+
+    def optimization_info(self) -> Dict[str, Any]:
+        return dict(self._opt_info)
+
+    def conditioning_cache_stats(self) -> Dict[str, Any]:
+        # As of the worker's last completed generation.
+        return dict(self._cond_stats)
+
+    def current_model_name(self) -> Optional[str]:
+        # The model the worker serves, reported even while it is warming up.
+        return self.model_name
+
+    def generate(
+        self,
+        prompt: str,
+        seconds: int,
+        sample_rate: int | None = None,
+        ctx: GenerationContext | None = None,
+        timeout: float | None = None,
+    ) -> AudioBuffer:
+        return self._call(prompt, seconds, sample_rate, ctx, timeout, None)
+
+    def generate_long(
+        self,
+        prompt: str,
+        seconds: float,
+        out_path: str,
+        sample_rate: int | None = None,
+        ctx: GenerationContext | None = None,
+        timeout: float | None = None,
+    ) -> int:
+        """Windowed render written by the worker straight to `out_path`; returns its rate."""
+        return self._call(prompt, seconds, sample_rate, ctx, timeout, str(out_path))
+
+    def _call(
+        self,
+        prompt: str,
+        seconds: float,
+        sample_rate: int | None,
+        ctx: GenerationContext | None,
+        timeout: float | None,
+        out_path: Optional[str],
+    ) -> Any:
+        deadline = time.monotonic() + (timeout if timeout is not None else float("inf"))
+        # One call at a time; waiting behind another caller counts against the deadline.
+        wait = -1 if timeout is None else max(0.0, deadline - time.monotonic())
+        if not self._call_lock.acquire(timeout=wait):
+            raise HeavyTimeout("heavy worker busy until the deadline")
+        try:
+            if not self._ready.wait(max(0.0, min(deadline - time.monotonic(), LOAD_TIMEOUT_S))):
+                raise HeavyTimeout("heavy worker not ready before deadline")
+            conn = self._conn
+            self._req_id += 1
+            req_id = self._req_id
+            conn.send(("generate", req_id, prompt, seconds, sample_rate, out_path))
+            cancel_sent_at: Optional[float] = None
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    self.timeouts += 1
+                    self._last_error = f"heavy generation exceeded deadline ({seconds}s audio)"
+                    _log.warning("[HEAVY] deadline exceeded; restarting worker")
+                    self.restart()
+                    raise HeavyTimeout(self._last_error)
+                if cancel_sent_at is not None and now - cancel_sent_at > CANCEL_GRACE_S:
+                    self.restart()
+                    raise GenerationCancelled("generation canceled (worker restarted)")
+                try:
+                    if not conn.poll(min(0.25, deadline - now)):
+                        continue
+                    msg: Any = conn.recv()
+                except (EOFError, OSError) as e:
+                    self._last_error = f"heavy worker crashed: {e}"
+                    self.restart()
+                    raise RuntimeError(self._last_error)
+                kind, mid = msg[0], msg[1]
+                if mid != req_id:
+                    continue
+                if kind == "progress":
+                    if ctx is not None and cancel_sent_at is None:
+                        try:
+                            ctx.report(msg[2])
+                        except GenerationCancelled:
+                            conn.send(("cancel", req_id))
+                            cancel_sent_at = time.monotonic()
+                elif kind == "ok":
+                    self._cond_stats = msg[3]
+                    return msg[2]
+                elif kind == "canceled":
+                    raise GenerationCancelled("generation canceled")
+                elif kind == "error":
+                    self._last_error = msg[2]
+                    raise RuntimeError(msg[2])
+        finally:
+            self._call_lock.release()
+
+
+supervisor = HeavySupervisor()
+
+
+def backend():
+    """The heavy engine in use: the supervisor, or the in-process module."""
+    if enabled():
+        return supervisor
+    from backend.services import heavy_audiogen
+    return heavy_audiogen
@@ -0,0 +1,206 @@
+# backend/services/history.py
+"""Generation history with constant-time latency and error statistics.
+
+The last HISTORY_SIZE generations are kept in a preallocated numpy record
+ring (34 bytes per record, no per-request allocation). Alongside it, each
+generator keeps a log-bucketed latency histogram (buckets grow by 5%, so a
+percentile is within ~2.5% of the exact value) plus request and error
+counts. A record leaving the ring is subtracted from them again, so
+percentiles and error rates describe exactly the generations in the ring,
+and a query scans a fixed number of buckets however many were recorded.
+Throughput is counted per wall-clock minute over the last hour.
+"""
+from __future__ import annotations
+import hashlib
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+HISTORY_SIZE = int(os.getenv("HISTORY_SIZE", "100000"))
+THROUGHPUT_MINUTES = 60
+MIN_MS = 1.0
+MAX_MS = 3_600_000.0
+GROWTH = 1.05
+_LOG_GROWTH = math.log(GROWTH)
+N_BUCKETS = int(math.ceil(math.log(MAX_MS / MIN_MS) / _LOG_GROWTH)) + 2  # + under/overflow
+MAX_GENERATORS = 255
+
+RECORD = np.dtype([
+    ("ts", "f8"),
+    ("prompt_fp", "u8"),
+    ("generator", "u1"),
+    ("duration", "f4"),
+    ("ms", "f4"),
+    ("bytes", "i8"),
+    ("ok", "?"),
+])
+
+# Representative latency of each bucket: its geometric midpoint.
+_BUCKET_MS = np.concatenate([
+    [MIN_MS / 2],
+    MIN_MS * GROWTH ** (np.arange(1, N_BUCKETS) - 0.5),
+])
+
+
+def prompt_fingerprint(prompt: str) -> int:
+    """Stable 64-bit prompt id (whitespace-normalized); unlike hash(), same across restarts."""
+    return int.from_bytes(hashlib.blake2b(" ".join(prompt.split()).encode(), digest_size=8).digest(), "little")
+
+
+def bucket_of(ms: float) -> int:
+    if ms < MIN_MS:
+        return 0
+    return min(N_BUCKETS - 1, 1 + int(math.log(ms / MIN_MS) / _LOG_GROWTH))
+
+
+class LatencySketch:
+    """Log-bucket histogram that supports removal (for a sliding window)."""
+
+    __slots__ = ("counts", "total", "errors")
+
+    def __init__(self):
+        self.counts = np.zeros(N_BUCKETS, dtype=np.int64)
+        self.total = 0
+        self.errors = 0
+
+    def add(self, ms: float, ok: bool, sign: int = 1) -> None:
+        self.counts[bucket_of(ms)] += sign
+        self.total += sign
+        if not ok:
+            self.errors += sign
+
+    def quantiles(self, qs: Sequence[float]) -> Dict[str, Optional[float]]:
+        if self.total <= 0:
+            return {f"p{q:g}": None for q in qs}
+        cum = np.cumsum(self.counts)
+        out = {}
+        for q in qs:
+            rank = max(1, math.ceil(q / 100 * self.total))
+            out[f"p{q:g}"] = round(float(_BUCKET_MS[int(np.searchsorted(cum, rank))]), 1)
+        return out
+
+    def describe(self, qs: Sequence[float] = (50, 95, 99)) -> Dict[str, Any]:
+        return {
+            "count": self.total,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.total, 4) if self.total else None,
+            **self.quantiles(qs),
+        }
+
+
+class GenerationHistory:
+    def __init__(self, capacity: int = HISTORY_SIZE):
+        self.capacity = max(1, capacity)
+        self._ring = np.zeros(self.capacity, dtype=RECORD)
+        self._next = 0  # total records ever written; slot = _next % capacity
+        self._lock = threading.Lock()
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._sketches: List[LatencySketch] = []
+        self._all = LatencySketch()
+        self._minute = np.full(THROUGHPUT_MINUTES, -1, dtype=np.int64)
+        self._per_minute = np.zeros(THROUGHPUT_MINUTES, dtype=np.int64)
+        self._errors_per_minute = np.zeros(THROUGHPUT_MINUTES, dtype=np.int64)
+
+    def _generator_id(self, name: str) -> int:
+        gid = self._ids.get(name)
+        if gid is None:
+            if len(self._names) >= MAX_GENERATORS:
+                name = "other"
+                gid = self._ids.get(name)
+            if gid is None:
+                gid = self._ids[name] = len(self._names)
+                self._names.append(name)
+                self._sketches.append(LatencySketch())
+        return gid
+
+    def record(
+        self, generator: str, prompt: str, duration: float, ms: float, nbytes: int = 0, ok: bool = True
+    ) -> None:
+        now = time.time()
+        fp = prompt_fingerprint(prompt)
+        # Bucket the value exactly as the f4 ring stores it, so eviction removes the same bucket.
+        ms = float(np.float32(ms))
+        with self._lock:
+            gid = self._generator_id(generator)
+            slot = self._next % self.capacity
+            if self._next >= self.capacity:
+                old = self._ring[slot]
+                self._sketches[old["generator"]].add(float(old["ms"]), bool(old["ok"]), -1)
+                self._all.add(float(old["ms"]), bool(old["ok"]), -1)
+            self._ring[slot] = (now, fp, gid, duration, ms, nbytes, ok)
+            self._next += 1
+            self._sketches[gid].add(ms, ok)
+            self._all.add(ms, ok)
+            minute = int(now // 60)
+            m = minute % THROUGHPUT_MINUTES
+            if self._minute[m] != minute:
+                self._minute[m] = minute
+                self._per_minute[m] = 0
+                self._errors_per_minute[m] = 0
+            self._per_minute[m] += 1
+            if not ok:
+                self._errors_per_minute[m] += 1
+
+    def recent(self, n: int = 10) -> List[Dict[str, Any]]:
+        """The last `n` generations, newest first."""
+        with self._lock:
+            k = min(n, self._next, self.capacity)
+            slots = [(self._next - 1 - i) % self.capacity for i in range(k)]
+            rows = self._ring[slots].copy()
+            names = list(self._names)
+        return [
+            {
+                "ts": round(float(r["ts"]), 3),
+                "prompt_hash": f"{int(r['prompt_fp']):016x}",
+                "generator": names[r["generator"]],
+                "duration": round(float(r["duration"]), 3),
+                "ms": int(r["ms"]),
+                "bytes": int(r["bytes"]),
+                "ok": bool(r["ok"]),
+            }
+            for r in rows
+        ]
+
+    def percentiles(self, generator: Optional[str] = None, qs: Sequence[float] = (50, 95, 99)) -> Dict[str, Any]:
+        with self._lock:
+            if generator is None:
+                return self._all.quantiles(qs)
+            gid = self._ids.get(generator)
+            return self._sketches[gid].quantiles(qs) if gid is not None else LatencySketch().quantiles(qs)
+
+    def throughput(self) -> Dict[str, Any]:
+        """Generations per minute, oldest to newest, for the last THROUGHPUT_MINUTES minutes."""
+        now_minute = int(time.time() // 60)
+        minutes = np.arange(now_minute - THROUGHPUT_MINUTES + 1, now_minute + 1)
+        slots = minutes % THROUGHPUT_MINUTES
+        with self._lock:
+            live = self._minute[slots] == minutes
+            counts = np.where(live, self._per_minute[slots], 0)
+            errors = np.where(live, self._errors_per_minute[slots], 0)
+        return {
+            "last_minute": int(counts[-1]),
+            "last_hour": int(counts.sum()),
+            "per_minute": counts.tolist(),
+            "errors_per_minute": errors.tolist(),
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            overall = self._all.describe()
+            by_generator = {name: self._sketches[i].describe() for i, name in enumerate(self._names)}
+            total = self._next
+        return {
+            "capacity": self.capacity,
+            "recorded": total,
+            "window": overall,
+            "generators": by_generator,
+            "throughput": self.throughput(),
+        }
+
+
+history = GenerationHistory()
@@ -1,3 +1,331 @@
-# Minimal stub to avoid startup failures; expand for queues later.
-def start_background_workers():
+# backend/services/job_processor.py
+"""Background generation queue.
+
+Jobs are executed FIFO by a small pool of worker threads. Every state change
+(queued -> running -> done/failed/canceled), queue position and the final
+file URL is published on the progress bus so clients can follow a job over
+one long-lived SSE connection instead of polling.
+
+Parameters and status transitions are also written to the SQLite job store,
+so a restart re-queues interrupted work and finished jobs stay queryable
+until their TTL expires. Every row is owned by the process running it, which
+refreshes its heartbeat every JOB_HEARTBEAT_S; `recover` only takes over
+rows whose owner has exited or gone silent for JOB_STALE_S, so a second
+process sharing the database never re-runs live work.
+
+Queue, running contexts and the progress bus are per process. With several
+web workers (start.py, WEB_WORKERS>1) a job runs in the worker that accepted
+it; another worker answers status from the store, streams its status
+transitions by polling the store, and forwards a cancel through the store
+for the owner to apply within JOB_CANCEL_POLL_S.
+"""
+from __future__ import annotations
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from backend.services import pipeline
+from backend.services.context import GenerationCancelled, GenerationContext
+from backend.services.job_store import JobStore
+from backend.services.progress import bus
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+CLEANUP_INTERVAL_S = 3600.0
+JOB_HEARTBEAT_S = float(os.getenv("JOB_HEARTBEAT_S", "10"))
+JOB_STALE_S = float(os.getenv("JOB_STALE_S", "60"))
+JOB_CANCEL_POLL_S = 1.0
+_HOST = socket.gethostname()
+
+_log = logging.getLogger("uvicorn.error")
+_cond = threading.Condition()
+_queue: Deque[str] = deque()
+_params: Dict[str, Dict[str, Any]] = {}
+_running: Dict[str, GenerationContext] = {}
+_workers: list[threading.Thread] = []
+_store: Optional[JobStore] = None
+_last_cleanup = 0.0
+_owner: Optional[Tuple[int, str]] = None
+_heartbeat: Optional[threading.Thread] = None
+_recovering = True
+
+
+def _after_fork() -> None:
+    """Threads do not survive fork() and SQLite handles must not cross it."""
+    global _store, _heartbeat
+    _store = None
+    _heartbeat = None
+    _workers.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def store() -> JobStore:
+    global _store
+    with _cond:
+        if _store is None:
+            _store = JobStore()
+        return _store
+
+
+def owner_id() -> str:
+    """This process in the job store: host:pid:nonce (the nonce tells a reused pid apart)."""
+    global _owner
+    pid = os.getpid()
+    if _owner is None or _owner[0] != pid:
+        _owner = (pid, f"{_HOST}:{pid}:{uuid.uuid4().hex[:8]}")
+    return _owner[1]
+
+
+def _owner_gone(owner: Optional[str], heartbeat: Optional[float], now: float) -> bool:
+    """True if the process holding a job can no longer be running it."""
+    if owner is None or heartbeat is None:  # written before rows had owners
+        return True
+    if owner == owner_id():
+        return False
+    if now - heartbeat > JOB_STALE_S:
+        return True
+    host, _, rest = owner.partition(":")
+    if host != _HOST:
+        return False
+    try:
+        pid = int(rest.split(":", 1)[0])
+    except ValueError:
+        return False
+    if pid == os.getpid():  # an earlier process that had our pid (e.g. a restarted container)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def _transition(job_id: str, **fields: Any) -> Dict[str, Any]:
+    """Publish a status change and persist it."""
+    snap = bus.publish(job_id, **fields)
+    store().update(snap)
+    return snap
+
+
+def _maybe_cleanup() -> None:
+    global _last_cleanup
+    now = time.time()
+    if now - _last_cleanup < CLEANUP_INTERVAL_S:
+        return
+    _last_cleanup = now
+    removed = store().cleanup()
+    if removed:
+        _log.info(f"[JOBS] purged {removed} expired jobs")
+
+
+def _publish_positions_locked() -> None:
+    for i, job_id in enumerate(_queue):
+        bus.publish(job_id, queue_position=i + 1)
+
+
+def submit(
+    prompt: str,
+    duration: int,
+    sample_rate: Optional[int],
+    policy: pipeline.Policy,
+    timeout_s: Optional[float] = None,
+    loop: bool = False,
+) -> Dict[str, Any]:
+    """Queue a generation and return its initial state.
+
+    `timeout_s` bounds the generation itself; time spent queued does not count.
+    """
+    job_id = uuid.uuid4().hex
+    params = {
+        "prompt": prompt,
+        "duration": duration,
+        "sample_rate": sample_rate,
+        "policy": policy,
+        "timeout_s": timeout_s,
+        "loop": loop,
+    }
+    db = store()
+    with _cond:
+        _params[job_id] = params
+        _queue.append(job_id)
+        snap = bus.publish(
+            job_id,
+            status="queued",
+            progress=0.0,
+            queue_position=len(_queue),
+            duration=duration,
+            created_at=time.time(),
+        )
+        db.insert(job_id, params, snap, owner_id())
+        _cond.notify()
+    _maybe_cleanup()
+    return snap
+
+
+def cancel(job_id: str) -> bool:
+    """Cancel a queued or running job. Returns False if unknown or already finished.
+
+    Running jobs stop at their generator's next progress checkpoint. A job
+    owned by another process is flagged in the store for its owner to cancel.
+    """
+    with _cond:
+        if job_id in _queue:
+            _queue.remove(job_id)
+            _params.pop(job_id, None)
+            _transition(job_id, status="canceled", queue_position=None)
+            _publish_positions_locked()
+            return True
+        ctx = _running.get(job_id)
+    if ctx is not None:
+        ctx.cancel()
+        bus.publish(job_id, cancel_requested=True)
+        return True
+    if bus.get(job_id) is not None:  # ours, and already finished
+        return False
+    return store().request_cancel(job_id)
+
+
+def with_links(state: Dict[str, Any]) -> Dict[str, Any]:
+    job_id = state["job_id"]
+    return {
+        **state,
+        "status_url": f"/api/jobs/{job_id}",
+        "events_url": f"/api/jobs/{job_id}/events",
+    }
+
+
+def get(job_id: str) -> Optional[Dict[str, Any]]:
+    """Live state if this process has seen the job, else the persisted record."""
+    return bus.get(job_id) or store().get(job_id)
+
+
+def list_jobs(status: Optional[str] = None, limit: int = 50) -> list[Dict[str, Any]]:
+    return store().list(status, limit)
+
+
+def queue_depth() -> int:
+    with _cond:
+        return len(_queue)
+
+
+def _run(job_id: str, params: Dict[str, Any], ctx: GenerationContext) -> None:
+    _transition(job_id, status="running", queue_position=0, progress=0.0, started_at=time.time())
+    try:
+        result = pipeline.generate(
+            params["prompt"], params["duration"], params["sample_rate"], params["policy"], ctx, params["timeout_s"],
+            loop=params.get("loop", False),
+        )
+    except GenerationCancelled:
+        _transition(job_id, status="canceled", finished_at=time.time())
+        return
+    except Exception as e:  # noqa: BLE001
+        _log.warning(f"[JOBS] {job_id} failed: {e}")
+        _transition(job_id, status="failed", error=str(e), finished_at=time.time())
+        return
+    _transition(
+        job_id,
+        status="done",
+        progress=1.0,
+        generator=result["generator"],
+        file_url=result["file_url"],
+        url=result["url"],
+        elapsed_ms=result["elapsed_ms"],
+        finished_at=time.time(),
+    )
+
+
+def _worker() -> None:
+    while True:
+        with _cond:
+            while not _queue:
+                _cond.wait()
+            job_id = _queue.popleft()
+            params = _params.pop(job_id)
+            ctx = GenerationContext(lambda f, jid=job_id: bus.publish(jid, progress=round(f, 3)))
+            _running[job_id] = ctx
+            _publish_positions_locked()
+        try:
+            _run(job_id, params, ctx)
+        finally:
+            with _cond:
+                _running.pop(job_id, None)
+
+
+def recover() -> int:
+    """Re-queue jobs whose owner exited or stopped heartbeating. Returns the count."""
+    db = store()
+    me = owner_id()
+    now = time.time()
+    recovered = 0
+    with _cond:
+        for rec in db.unfinished():
+            job_id = rec["job_id"]
+            if job_id in _params or job_id in _running:
+                continue
+            if not _owner_gone(rec["owner"], rec["heartbeat"], now):
+                continue
+            if not db.claim(job_id, rec["owner"], me):  # another process took it over first
+                continue
+            _params[job_id] = rec["params"]
+            _queue.append(job_id)
+            bus.publish(job_id, **rec["state"])
+            _transition(job_id, status="queued", progress=0.0, recovered=rec["status"] == "running")
+            recovered += 1
+        if recovered:
+            _publish_positions_locked()
+            _cond.notify_all()
+    if recovered:
+        _log.info(f"[JOBS] re-queued {recovered} interrupted jobs")
+    return recovered
+
+
+def _heartbeat_loop() -> None:
+    """Apply cancels forwarded by other processes; keep this process's jobs fresh;
+    pick up jobs of owners that died meanwhile (if this process recovers jobs)."""
+    last_beat = time.monotonic()
+    while True:
+        time.sleep(JOB_CANCEL_POLL_S)
+        try:
+            for job_id in store().take_cancel_requests(owner_id()):
+                cancel(job_id)
+            if time.monotonic() - last_beat < JOB_HEARTBEAT_S:
+                continue
+            last_beat = time.monotonic()
+            store().heartbeat(owner_id())
+            if _recovering:
+                recover()
+                _maybe_cleanup()
+        except Exception as e:  # noqa: BLE001
+            _log.warning(f"[JOBS] heartbeat failed: {e}")
+
+
+def start_background_workers(n: int = JOB_WORKERS, recover_jobs: bool = True) -> bool:
+    """Start the worker and heartbeat threads once per process.
+
+    With `recover_jobs` (one process per database) this process also
+    re-queues jobs of dead owners and purges expired ones.
+    """
+    global _heartbeat, _recovering
+    _recovering = recover_jobs
+    if not _workers and recover_jobs:
+        recover()
+        _maybe_cleanup()
+    if _heartbeat is None or not _heartbeat.is_alive():
+        _heartbeat = threading.Thread(target=_heartbeat_loop, name="job-heartbeat", daemon=True)
+        _heartbeat.start()
+    with _cond:
+        alive = [t for t in _workers if t.is_alive()]
+        for i in range(len(alive), max(1, n)):
+            t = threading.Thread(target=_worker, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            alive.append(t)
+        _workers[:] = alive
     return True
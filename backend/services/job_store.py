@@ -0,0 +1,185 @@
+# backend/services/job_store.py
+"""Durable job records in SQLite (WAL mode).
+
+The progress bus holds live state for streaming; this store holds what must
+survive a restart: the job's parameters and its last status transition.
+Each unfinished row names its owner (the process that queued or recovered
+it) and carries a heartbeat the owner refreshes while it lives; only rows
+whose owner is gone are handed back to a queue, and finished jobs are
+purged after JOB_TTL_S.
+"""
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+APP_ROOT = Path(__file__).resolve().parents[2]
+DB_PATH = Path(os.getenv("JOB_DB_PATH", str(APP_ROOT / "backend" / "data" / "jobs.sqlite3")))
+JOB_TTL_S = float(os.getenv("JOB_TTL_S", str(7 * 24 * 3600)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id      TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    state       TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    owner       TEXT,
+    heartbeat   REAL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated_at);
+"""
+
+# Columns added after the first release; ALTERed into older databases.
+_MIGRATIONS = {
+    "owner": "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    "heartbeat": "ALTER TABLE jobs ADD COLUMN heartbeat REAL",
+    "cancel_requested": "ALTER TABLE jobs ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0",
+}
+
+# Fields of the live state worth persisting; progress ticks are not.
+_PERSISTED = (
+    "status", "duration", "created_at", "started_at", "finished_at",
+    "generator", "file_url", "url", "elapsed_ms", "error", "recovered",
+)
+
+
+class JobStore:
+    def __init__(self, path: Path = DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by the worker threads, serialized by a lock.
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+            columns = {r[1] for r in self._db.execute("PRAGMA table_info(jobs)")}
+            for column, ddl in _MIGRATIONS.items():
+                if column not in columns:
+                    self._db.execute(ddl)
+
+    def insert(self, job_id: str, params: Dict[str, Any], state: Dict[str, Any], owner: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (job_id, status, params, state, created_at, updated_at, owner, heartbeat)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, state["status"], json.dumps(params), json.dumps(_persisted(state)), now, now, owner, now),
+            )
+
+    def update(self, state: Dict[str, Any]) -> None:
+        """Persist a status transition from a bus snapshot."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, state = ?, updated_at = ? WHERE job_id = ?",
+                (state["status"], json.dumps(_persisted(state)), time.time(), state["job_id"]),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT job_id, state FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {"job_id": row[0], **json.loads(row[1])}
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first, optionally filtered by status."""
+        sql = "SELECT job_id, state FROM jobs"
+        args: tuple = ()
+        if status:
+            sql += " WHERE status = ?"
+            args = (status,)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(sql, args + (limit,)).fetchall()
+        return [{"job_id": r[0], **json.loads(r[1])} for r in rows]
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Queued and running jobs in submission order, with their params and owner."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT job_id, status, params, state, owner, heartbeat FROM jobs"
+                " WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [
+            {
+                "job_id": r[0], "status": r[1], "params": json.loads(r[2]), "state": json.loads(r[3]),
+                "owner": r[4], "heartbeat": r[5],
+            }
+            for r in rows
+        ]
+
+    def claim(self, job_id: str, previous: Optional[str], owner: str) -> bool:
+        """Take over an unfinished job from `previous`; False if someone else got it first."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET owner = ?, heartbeat = ? WHERE job_id = ? AND owner IS ?"
+                " AND status IN ('queued', 'running')",
+                (owner, time.time(), job_id, previous),
+            )
+        return cur.rowcount == 1
+
+    def request_cancel(self, job_id: str) -> bool:
+        """Flag an unfinished job for its owner to cancel. False if it already finished."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status IN ('queued', 'running')",
+                (job_id,),
+            )
+        return cur.rowcount == 1
+
+    def take_cancel_requests(self, owner: str) -> List[str]:
+        """Unfinished jobs held by `owner` that another process asked to cancel (flags cleared)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT job_id FROM jobs WHERE owner = ? AND cancel_requested = 1"
+                " AND status IN ('queued', 'running')",
+                (owner,),
+            ).fetchall()
+            ids = [r[0] for r in rows]
+            if ids:
+                self._db.execute(
+                    f"UPDATE jobs SET cancel_requested = 0 WHERE job_id IN ({','.join('?' * len(ids))})", ids
+                )
+        return ids
+
+    def heartbeat(self, owner: str) -> int:
+        """Refresh the heartbeat of every unfinished job `owner` holds. Returns rows touched."""
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status IN ('queued', 'running')",
+                (time.time(), owner),
+            )
+        return cur.rowcount
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+    def cleanup(self, ttl_s: float = JOB_TTL_S) -> int:
+        """Delete finished jobs not updated within `ttl_s`. Returns rows removed."""
+        cutoff = time.time() - ttl_s
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed', 'canceled') AND updated_at < ?",
+                (cutoff,),
+            )
+        return cur.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _persisted(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: state[k] for k in _PERSISTED if k in state}
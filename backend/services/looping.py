@@ -0,0 +1,84 @@
+# backend/services/looping.py
+"""Loopable extension: long ambiences built from a short base clip.
+
+The base clip's tail is equal-power crossfaded into its head, giving a loop
+unit that tiles without a seam; the output is the untouched base followed by
+as many loop units as needed. Rendering cost is that of the base clip plus a
+memory copy, independent of the requested duration.
+"""
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+BASE_SECONDS = int(os.getenv("LOOP_BASE_S", "10"))
+CROSSFADE_S = float(os.getenv("LOOP_CROSSFADE_S", "1.5"))
+FADE_OUT_MS = 40
+_BASE_CACHE_MAX = 256
+
+# (normalized prompt, seconds, sample_rate, policy) -> (base clip path, generator)
+_bases: "OrderedDict[Tuple[str, int, Optional[int], str], Tuple[Path, str]]" = OrderedDict()
+_bases_lock = threading.Lock()
+
+
+def _key(prompt: str, seconds: int, sample_rate: Optional[int], policy: str) -> Tuple[str, int, Optional[int], str]:
+    return " ".join(prompt.lower().split()), seconds, sample_rate, policy
+
+
+def cached_base(prompt: str, seconds: int, sample_rate: Optional[int], policy: str) -> Optional[Tuple[Path, str]]:
+    """A previously rendered (base clip, generator) for this prompt, if the file still exists."""
+    key = _key(prompt, seconds, sample_rate, policy)
+    with _bases_lock:
+        hit = _bases.get(key)
+        if hit is None:
+            return None
+        if not hit[0].exists():
+            del _bases[key]
+            return None
+        _bases.move_to_end(key)
+        return hit
+
+
+def remember_base(
+    prompt: str, seconds: int, sample_rate: Optional[int], policy: str, path: Path, generator: str
+) -> None:
+    with _bases_lock:
+        _bases[_key(prompt, seconds, sample_rate, policy)] = (path, generator)
+        while len(_bases) > _BASE_CACHE_MAX:
+            _bases.popitem(last=False)
+
+
+def loop_extend(base: np.ndarray, frames: int, sr: int, crossfade_s: float = CROSSFADE_S) -> np.ndarray:
+    """Extend `base` (frames[, channels]) to `frames` by seamless looping."""
+    n = base.shape[0]
+    if frames <= n:
+        return base[:frames]
+    xf = min(int(crossfade_s * sr), n // 2)
+    t = (np.arange(xf, dtype=np.float32) + 0.5) / max(xf, 1)
+    fade_in = np.sin(t * (np.pi / 2))
+    fade_out = np.cos(t * (np.pi / 2))
+    if base.ndim == 2:
+        fade_in, fade_out = fade_in[:, None], fade_out[:, None]
+
+    # Loop unit: period n - xf, starting where the tail fades into the head.
+    unit = base[: n - xf].copy()
+    unit[:xf] = base[n - xf:] * fade_out + base[:xf] * fade_in
+
+    out = np.empty((frames,) + base.shape[1:], dtype=base.dtype)
+    head = n - xf
+    out[:head] = base[:head]
+    pos = head
+    while pos < frames:
+        k = min(unit.shape[0], frames - pos)
+        out[pos:pos + k] = unit[:k]
+        pos += k
+
+    fade = min(int(FADE_OUT_MS * sr / 1000), frames)
+    if fade:
+        ramp = np.linspace(1.0, 0.0, fade, dtype=np.float32)
+        out[-fade:] *= ramp[:, None] if out.ndim == 2 else ramp
+    return out
@@ -0,0 +1,276 @@
+# backend/services/pipeline.py
+"""Generation pipeline shared by the synchronous route and the job worker."""
+from __future__ import annotations
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Dict, Iterator, Literal
+from backend.services.generate import DEFAULT_SAMPLE_RATE, generate_file as fallback_generate
+from backend.services import heavy_audiogen as heavy
+from backend.services import heavy_worker, looping
+from backend.services.heavy_worker import HeavyTimeout
+from backend.services.profiling import profiled
+from backend.services.audio_buffer import AudioBuffer
+from backend.services.admission import AdmissionRejected, controller as admission
+from backend.services.context import GenerationCancelled, GenerationContext, GenerationTimeout
+from backend.services.sfx_library import library
+from backend.services.history import history
+from backend.services.storage import StorageError, storage
+from backend.services.storage_layout import layout
+
+Policy = Literal["auto", "heavy", "fallback"]
+APP_ROOT = Path(__file__).resolve().parents[2]
+OUTPUT_DIR = APP_ROOT / "backend" / "output_audio"
+GENERATION_TIMEOUT_S = float(os.getenv("GENERATION_TIMEOUT_S", "300"))
+MAX_DURATION_S = int(os.getenv("MAX_DURATION_S", "300"))
+PREVIEW_SECONDS = int(os.getenv("PREVIEW_SECONDS", "3"))
+PREVIEW_SAMPLE_RATE = int(os.getenv("PREVIEW_SAMPLE_RATE", "16000"))
+PREVIEW_BUDGET_S = float(os.getenv("PREVIEW_BUDGET_S", "2"))
+
+_log = logging.getLogger("uvicorn.error")
+
+
+class HeavyGenerationFailed(RuntimeError):
+    """Heavy generation was required (prefer=heavy, no fallback) and failed."""
+
+
+def resolve_policy(prefer: str | None) -> Policy:
+    p = (prefer or "auto").lower()
+    return "heavy" if p == "heavy" else ("fallback" if p == "fallback" else "auto")
+
+
+def _commit(out_path: Path) -> bool:
+    """Hand a render to storage. False if only the local copy is committed
+    (the backend retries the upload); the render itself is never redone."""
+    try:
+        storage.commit(out_path)
+    except StorageError as e:
+        _log.warning(f"[STORAGE] serving {out_path.name} from local disk: {e}")
+        return False
+    return True
+
+
+@contextmanager
+def _inline_deadline(ctx: GenerationContext, deadline: float) -> Iterator[None]:
+    """An in-process heavy call cannot be preempted: enforce `deadline` at its
+    progress checkpoints instead (the call stops at the first one past it)."""
+    previous, ctx.deadline = ctx.deadline, deadline
+    try:
+        yield
+    except GenerationTimeout as e:
+        raise HeavyTimeout(f"heavy generation exceeded deadline: {e}") from e
+    finally:
+        ctx.deadline = previous
+
+
+def _result(
+    generator: str, prompt: str, out_path: Path, duration: int, t0: float, sample_rate: int | None,
+    stored: bool = True, record: bool = True,
+) -> Dict[str, Any]:
+    elapsed = int((time.time() - t0) * 1000)
+    if record:
+        try:
+            nbytes = out_path.stat().st_size
+        except OSError:
+            nbytes = 0
+        history.record(generator, prompt, duration, elapsed, nbytes)
+    rel = f"/audio/{out_path.stem}.wav"
+    result = {
+        "ok": True,
+        "generator": generator,
+        "file_url": rel,
+        "url": rel,
+        "path": str(out_path),
+        "duration": duration,
+        "sample_rate": sample_rate,
+        "elapsed_ms": elapsed,
+    }
+    if not stored:
+        result["upload_pending"] = True
+    return result
+
+
+@profiled
+def generate(
+    prompt: str,
+    duration: int,
+    sample_rate: int | None,
+    policy: Policy,
+    ctx: GenerationContext | None = None,
+    timeout_s: float | None = None,
+    variation: int = 0,
+    use_library: bool = True,
+    loop: bool = False,
+) -> Dict[str, Any]:
+    """Render `prompt` to a WAV under OUTPUT_DIR and describe the result.
+
+    The heavy path runs against a deadline (`timeout_s`, default
+    GENERATION_TIMEOUT_S). It is skipped up front when the observed throughput
+    says the deadline cannot be met. With HEAVY_ISOLATION=process an
+    overrunning call is preempted by restarting the worker; in-process it is
+    stopped at the model's next progress checkpoint past the deadline.
+
+    Prompts in the pre-rendered SFX library are served from it unless
+    `use_library` is False; `variation` varies the procedural render. With
+    `loop`, durations above LOOP_BASE_S are looped from a (cached) base clip.
+
+    Raises AdmissionRejected, HeavyTimeout or HeavyGenerationFailed only when
+    the policy forbids falling back to the procedural generator, and
+    GenerationCancelled (never falling back) when `ctx` is canceled.
+    """
+    return _render(prompt, duration, sample_rate, policy, ctx, timeout_s, variation, use_library, loop)
+
+
+def _render(
+    prompt: str,
+    duration: int,
+    sample_rate: int | None,
+    policy: Policy,
+    ctx: GenerationContext | None,
+    timeout_s: float | None,
+    variation: int,
+    use_library: bool,
+    loop: bool,
+    record: bool = True,
+) -> Dict[str, Any]:
+    """`generate` minus the profiler. With `record=False` a success is left out
+    of the history (the loop base: its caller records the looped result)."""
+    t0 = time.time()
+    deadline = t0 + (timeout_s or GENERATION_TIMEOUT_S)
+    use_heavy = os.getenv("USE_HEAVY", "0") == "1"
+    allow_fallback = os.getenv("ALLOW_FALLBACK", "1") == "1"
+    strict = policy == "heavy" and not allow_fallback
+
+    if loop and duration > looping.BASE_SECONDS:
+        return _loop_extended(prompt, duration, sample_rate, policy, ctx, timeout_s, variation, use_library, t0)
+
+    if use_library:
+        entry = library.match(prompt, duration, sample_rate, policy)
+        if entry is not None:
+            path = layout.resolve(entry.filename) or layout.path_for(entry.filename)
+            result = _result("library", prompt, path, duration, t0, entry.sample_rate, record=record)
+            result["library"] = {"tone": entry.tone, "variation": entry.variation, "generator": entry.generator}
+            return result
+
+    # heavy path (only when enabled)
+    if use_heavy and policy in ("auto", "heavy"):
+        isolated = heavy_worker.enabled()
+        engine = heavy_worker.supervisor if isolated else heavy
+        if not isolated and ctx is None:
+            ctx = GenerationContext()  # carries the inline deadline
+        attempted = False  # reached the engine (vs. skipped by admission / the estimate)
+        try:
+            if not engine.is_ready():
+                engine.load_model()
+            # An isolated worker that is still warming up may be waited on
+            # (within the deadline) when the caller insists on heavy output.
+            if engine.is_ready() or (isolated and policy == "heavy"):
+                estimate = admission.estimate_seconds(duration)
+                if estimate is not None and estimate > deadline - time.time():
+                    raise HeavyTimeout(
+                        f"estimated {estimate:.0f}s exceeds the {deadline - time.time():.0f}s left before the deadline"
+                    )
+                longform = duration > heavy.LONGFORM_MIN_S
+                peak = heavy.WINDOW_S if longform else None
+                out_path = layout.new_path(".wav")
+                with admission.reserve(
+                    duration, engine.current_model_name(), engine.current_device() == "cuda", peak_duration=peak
+                ):
+                    t_gen = time.time()
+                    attempted = True
+                    timeout = {"timeout": deadline - time.time()} if isolated else {}
+                    with nullcontext() if isolated else _inline_deadline(ctx, deadline):
+                        if longform:
+                            # Windowed render streamed straight to the file; memory bounded by WINDOW_S.
+                            try:
+                                out_sr = engine.generate_long(prompt, duration, out_path, sample_rate, ctx, **timeout)
+                            except BaseException:
+                                out_path.unlink(missing_ok=True)
+                                raise
+                        else:
+                            buf = engine.generate(prompt, duration, sample_rate, ctx, **timeout)
+                    admission.observe(duration, time.time() - t_gen)
+                if not longform:
+                    buf.write(out_path, subtype="PCM_16")
+                    out_sr = buf.sample_rate
+                stored = _commit(out_path)
+                return _result("heavy", prompt, out_path, duration, t0, out_sr, stored, record)
+            elif strict:
+                raise RuntimeError(engine.last_heavy_error() or "heavy model unavailable")
+        except GenerationCancelled:
+            raise
+        except (AdmissionRejected, HeavyTimeout):
+            if attempted:
+                history.record("heavy", prompt, duration, (time.time() - t0) * 1000, ok=False)
+            if strict:
+                raise
+            # else: serve this request from the fallback generator
+        except Exception as e:
+            history.record("heavy", prompt, duration, (time.time() - t0) * 1000, ok=False)
+            try:
+                from backend import main as mainmod  # lazy to avoid cycles
+                mainmod.note_error(e)
+            except Exception:
+                pass
+            if strict:
+                raise HeavyGenerationFailed(f"heavy generation failed: {e}") from e
+            # else: fall through to fallback
+
+    # fallback path
+    try:
+        out_path = fallback_generate(prompt, duration, OUTPUT_DIR, sample_rate, ctx, variation)
+    except GenerationCancelled:
+        raise
+    except Exception:
+        history.record("fallback", prompt, duration, (time.time() - t0) * 1000, ok=False)
+        raise
+    stored = _commit(out_path)
+    return _result("fallback", prompt, out_path, duration, t0, sample_rate or DEFAULT_SAMPLE_RATE, stored, record)
+
+
+def preview(prompt: str, duration: int, policy: Policy, ctx: GenerationContext | None = None) -> Dict[str, Any]:
+    """Quick draft of `prompt`: PREVIEW_SECONDS at PREVIEW_SAMPLE_RATE.
+
+    The heavy model is used only when the observed throughput says it fits in
+    PREVIEW_BUDGET_S; otherwise (or before anything has been observed) the
+    draft comes from the library or the procedural engine.
+    """
+    seconds = max(1, min(duration, PREVIEW_SECONDS))
+    estimate = admission.estimate_seconds(seconds)
+    fits = estimate is not None and estimate <= PREVIEW_BUDGET_S
+    draft_policy: Policy = "auto" if policy != "fallback" and fits else "fallback"
+    result = generate(prompt, seconds, PREVIEW_SAMPLE_RATE, draft_policy, ctx, timeout_s=PREVIEW_BUDGET_S)
+    result["preview"] = True
+    return result
+
+
+def _loop_extended(
+    prompt: str,
+    duration: int,
+    sample_rate: int | None,
+    policy: Policy,
+    ctx: GenerationContext | None,
+    timeout_s: float | None,
+    variation: int,
+    use_library: bool,
+    t0: float,
+) -> Dict[str, Any]:
+    import soundfile as sf
+    base_s = looping.BASE_SECONDS
+    cached = looping.cached_base(prompt, base_s, sample_rate, policy)
+    if cached is None:
+        base = _render(prompt, base_s, sample_rate, policy, ctx, timeout_s, variation, use_library, False, record=False)
+        base_path, generator = Path(base["path"]), base["generator"]
+        looping.remember_base(prompt, base_s, sample_rate, policy, base_path, generator)
+    else:
+        base_path, generator = cached
+    audio, sr = sf.read(base_path, dtype="float32")
+    out = looping.loop_extend(audio, duration * sr, sr)
+    out_path = layout.new_path(".wav")
+    AudioBuffer.from_array(out, sr).write(out_path, subtype="PCM_16")
+    stored = _commit(out_path)
+    result = _result(generator, prompt, out_path, duration, t0, sr, stored)
+    result["loop"] = {"base_url": f"/audio/{base_path.name}", "base_seconds": base_s, "reused": cached is not None}
+    return result
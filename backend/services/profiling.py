@@ -0,0 +1,316 @@
+# backend/services/profiling.py
+"""On-demand profiling of live generations.
+
+Nothing is installed unless PROFILE_TOKEN is set, and even then the only
+cost on an unprofiled generation is one attribute check plus one
+ContextVar lookup in `profiled`. Two ways to turn it on (token required):
+
+- a session (POST /api/debug/profile): the next N generations, or every
+  generation started in the next T seconds, are profiled into one run;
+- a single request: `X-Profile: 1` (+ `X-Profile-Token`) profiles the
+  generation that request runs; the response carries `X-Profile-Id`.
+
+Modes: `cprofile` (deterministic, per generation thread; pstats output)
+and `sampling` (a background thread samples the generation threads' stacks
+every SAMPLE_INTERVAL_MS; collapsed-stack output for flamegraph tools).
+Job-queue generations are covered by sessions, not by `X-Profile`.
+Since 3.12 only one cProfile can be active per process; a generation that
+overlaps another cprofile run is run unprofiled and counted as `skipped`.
+"""
+from __future__ import annotations
+import contextvars
+import cProfile
+import functools
+import hmac
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, TypeVar
+
+from fastapi import HTTPException, Request
+
+TOKEN = os.getenv("PROFILE_TOKEN", "")
+MAX_SECONDS = float(os.getenv("PROFILE_MAX_S", "300"))
+SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+KEEP_RUNS = 16
+MODES = ("cprofile", "sampling")
+
+F = TypeVar("F", bound=Callable[..., Any])
+_request_run: contextvars.ContextVar[Optional["ProfileRun"]] = contextvars.ContextVar("profile_run", default=None)
+
+
+def enabled() -> bool:
+    return bool(TOKEN)
+
+
+def check_token(request: Request) -> None:
+    """404 while profiling is disabled (the endpoint does not exist), 401 on a bad token."""
+    if not TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    given = request.headers.get("X-Profile-Token") or ""
+    auth = request.headers.get("Authorization") or ""
+    if auth.lower().startswith("bearer "):
+        given = given or auth[7:]
+    if not hmac.compare_digest(given.encode(), TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="invalid profile token")
+
+
+class ProfileRun:
+    def __init__(
+        self,
+        mode: str,
+        requests: Optional[int] = None,
+        seconds: Optional[float] = None,
+        interval_ms: float = SAMPLE_INTERVAL_MS,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"unknown profile mode {mode!r}")
+        self.id = uuid.uuid4().hex[:12]
+        self.mode = mode
+        self.remaining = requests
+        self.created_at = time.time()
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.interval_s = max(0.001, interval_ms / 1000.0)
+        self.profiled = 0
+        self.skipped = 0  # generations that ran unprofiled (another cProfile was active)
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._threads: Set[int] = set()
+        self._sampler: Optional[threading.Thread] = None
+        self._active = 0
+
+    # Session accounting ------------------------------------------------------
+
+    def claim(self) -> bool:
+        """Reserve one generation for this run; False once it is used up or expired."""
+        with self._lock:
+            if self.finished_at is not None:
+                return False
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                return False
+            if self.remaining is not None:
+                if self.remaining <= 0:
+                    return False
+                self.remaining -= 1
+            return True
+
+    @property
+    def exhausted(self) -> bool:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        return self.remaining is not None and self.remaining <= 0
+
+    @property
+    def busy(self) -> bool:
+        with self._lock:
+            return bool(self._threads) or self._active > 0
+
+    def finish(self) -> None:
+        with self._lock:
+            if self.finished_at is None:
+                self.finished_at = time.time()
+
+    # Collection --------------------------------------------------------------
+
+    def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if self.mode == "cprofile":
+            with self._lock:
+                self._active += 1
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:  # 3.12+: one deterministic profiler per process at a time
+                with self._lock:
+                    self._active -= 1
+                    self.skipped += 1
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.disable()
+                self._merge(prof)
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads.add(ident)
+            self.profiled += 1
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(target=self._sample_loop, name=f"profiler-{self.id}", daemon=True)
+                self._sampler.start()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._threads.discard(ident)
+
+    def _merge(self, prof: cProfile.Profile) -> None:
+        with self._lock:
+            self._active -= 1
+            self.profiled += 1
+            if self._stats is None:
+                self._stats = pstats.Stats(prof)
+            else:
+                self._stats.add(prof)
+
+    def _sample_loop(self) -> None:
+        while True:
+            with self._lock:
+                targets = set(self._threads)
+                if not targets:
+                    self._sampler = None
+                    return
+            frames = sys._current_frames()
+            for ident in targets:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self._record(frame)
+            time.sleep(self.interval_s)
+
+    def _record(self, frame: Any) -> None:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+            frame = frame.f_back
+        with self._lock:
+            self._stacks[";".join(reversed(names))] += 1
+            self._samples += 1
+
+    # Output ------------------------------------------------------------------
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "profiled": self.profiled,
+            "skipped": self.skipped,
+            "remaining": self.remaining,
+            "samples": self._samples if self.mode == "sampling" else None,
+        }
+
+    def render(self, fmt: str = "pstats", sort: str = "cumulative", limit: int = 60) -> bytes:
+        """pstats text or raw (cprofile), collapsed stacks (sampling)."""
+        with self._lock:
+            if self.mode == "sampling":
+                if fmt != "collapsed":
+                    raise ValueError("sampling runs only render as 'collapsed'")
+                return "".join(f"{stack} {n}\n" for stack, n in self._stacks.most_common()).encode()
+            if fmt not in ("pstats", "raw"):
+                raise ValueError("cprofile runs render as 'pstats' or 'raw'")
+            note = (
+                f"INCOMPLETE: {self.skipped} generation(s) ran unprofiled while another cProfile run "
+                f"was active; use mode=sampling for concurrent profiling.\n\n" if self.skipped else ""
+            )
+            if self._stats is None:
+                return note.encode()
+            if fmt == "raw":
+                return marshal.dumps(self._stats.stats)  # type: ignore[attr-defined]
+            out = io.StringIO(note)
+            out.seek(len(note))
+            self._stats.stream = out  # type: ignore[attr-defined]
+            self._stats.sort_stats(sort).print_stats(limit)
+            return out.getvalue().encode()
+
+
+class Profiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.session: Optional[ProfileRun] = None
+        self._runs: "OrderedDict[str, ProfileRun]" = OrderedDict()
+
+    def _keep(self, run: ProfileRun) -> ProfileRun:
+        with self._lock:
+            self._runs[run.id] = run
+            while len(self._runs) > KEEP_RUNS:
+                self._runs.popitem(last=False)
+        return run
+
+    def start(
+        self, mode: str, requests: Optional[int] = None, seconds: Optional[float] = None,
+        interval_ms: float = SAMPLE_INTERVAL_MS,
+    ) -> ProfileRun:
+        """Profile the next `requests` generations or those started within `seconds`."""
+        if requests is None and seconds is None:
+            requests = 1
+        seconds = min(seconds, MAX_SECONDS) if seconds else (MAX_SECONDS if requests is None else None)
+        with self._lock:
+            if self.session is not None and not self.session.exhausted:
+                raise RuntimeError(f"profile session {self.session.id} is already running")
+        run = self._keep(ProfileRun(mode, requests, seconds, interval_ms))
+        self.session = run
+        return run
+
+    def stop(self) -> Optional[ProfileRun]:
+        run, self.session = self.session, None
+        if run is not None:
+            run.finish()
+        return run
+
+    def request_run(self, mode: str = "cprofile") -> ProfileRun:
+        return self._keep(ProfileRun(mode, requests=1))
+
+    def current(self) -> Optional[ProfileRun]:
+        """The running session; a used-up one is closed here so its result is final."""
+        session = self.session
+        if session is not None and session.exhausted and not session.busy:
+            self.stop()
+            return None
+        return session
+
+    def get(self, run_id: str) -> Optional[ProfileRun]:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def runs(self) -> list:
+        with self._lock:
+            return [r.describe() for r in reversed(self._runs.values())]
+
+    def _claim(self) -> Optional[ProfileRun]:
+        run = _request_run.get()
+        if run is not None and run.claim():
+            return run
+        session = self.session
+        if session is None:
+            return None
+        if session.claim():
+            return session
+        if session.exhausted:
+            self.stop()
+        return None
+
+
+profiler = Profiler()
+
+
+def profiled(fn: F) -> F:
+    """Run `fn` under the active profile run, if any."""
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if profiler.session is None and _request_run.get() is None:
+            return fn(*args, **kwargs)
+        run = profiler._claim()
+        if run is None:
+            return fn(*args, **kwargs)
+        return run.run(fn, *args, **kwargs)
+    return wrapper  # type: ignore[return-value]
+
+
+def bind_request(run: ProfileRun) -> contextvars.Token:
+    return _request_run.set(run)
+
+
+def unbind_request(token: contextvars.Token) -> None:
+    run = _request_run.get()
+    _request_run.reset(token)
+    if run is not None:
+        run.finish()
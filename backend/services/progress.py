@@ -0,0 +1,112 @@
+# backend/services/progress.py
+"""In-process job state bus with async subscribers.
+
+Workers (plain threads) publish state changes; HTTP handlers subscribe and
+stream them to clients over SSE. Each publish merges into the job's latest
+state, so a late subscriber immediately receives the current snapshot and a
+slow one only ever sees the newest state rather than a backlog.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+TERMINAL_STATES = {"done", "failed", "canceled"}
+MAX_TRACKED_JOBS = 10000
+
+
+class Subscription:
+    """A single listener's view of one job."""
+
+    def __init__(self, bus: "ProgressBus", job_id: str):
+        self._bus = bus
+        self.job_id = job_id
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def _deliver(self, snap: Dict[str, Any]) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, snap)
+        except RuntimeError:
+            pass  # loop already closed
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Next state (newest wins if several queued up), or None on timeout."""
+        try:
+            snap = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        while not self._queue.empty():
+            snap = self._queue.get_nowait()
+        return snap
+
+    def close(self) -> None:
+        self._bus._unsubscribe(self)
+
+
+class ProgressBus:
+    def __init__(self, max_jobs: int = MAX_TRACKED_JOBS):
+        self._lock = threading.Lock()
+        self._state: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._subs: Dict[str, List[Subscription]] = {}
+        self.max_jobs = max_jobs
+
+    def publish(self, job_id: str, **fields: Any) -> Dict[str, Any]:
+        """Merge `fields` into the job state and notify subscribers (thread-safe)."""
+        with self._lock:
+            state = self._state.setdefault(job_id, {"job_id": job_id})
+            state.update(fields)
+            state["updated_at"] = time.time()
+            snap = dict(state)
+            subs = list(self._subs.get(job_id, ()))
+            self._evict_locked()
+        for sub in subs:
+            sub._deliver(snap)
+        return snap
+
+    def _evict_locked(self) -> None:
+        if len(self._state) <= self.max_jobs:
+            return
+        for job_id in list(self._state):
+            if len(self._state) <= self.max_jobs:
+                break
+            if self._state[job_id].get("status") in TERMINAL_STATES and job_id not in self._subs:
+                del self._state[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self._state.get(job_id)
+            return dict(state) if state is not None else None
+
+    def subscribe(self, job_id: str) -> Subscription:
+        """Register a listener; the current state (if any) is delivered first."""
+        sub = Subscription(self, job_id)
+        with self._lock:
+            self._subs.setdefault(job_id, []).append(sub)
+            state = self._state.get(job_id)
+            snap = dict(state) if state is not None else None
+        if snap is not None:
+            sub._queue.put_nowait(snap)
+        return sub
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.job_id)
+            if subs and sub in subs:
+                subs.remove(sub)
+                if not subs:
+                    del self._subs[sub.job_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+
+def sse_event(data: Dict[str, Any], event: str = "state") -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+bus = ProgressBus()
@@ -0,0 +1,128 @@
+# backend/services/resample.py
+"""Polyphase sample-rate conversion.
+
+The rate change src -> dst is reduced to up/down = dst/src in lowest terms.
+A Kaiser-windowed sinc prototype is designed once per ratio and split into
+`up` phases of K taps (cached). Each output sample is one K-tap dot product
+against the input, evaluated block-wise as a gather plus einsum over all
+channels at once, so cost is O(output_frames * K * channels) regardless of
+how large up and down are. `StreamResampler` applies the same filter to
+audio that arrives in pieces, with no seams at the piece boundaries.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from math import ceil, gcd
+from typing import Tuple
+
+import numpy as np
+
+from backend.services.audio_buffer import AudioBuffer
+
+ZERO_CROSSINGS = 10  # filter half-width, in periods of the lower of the two rates
+ROLLOFF = 0.945  # passband edge as a fraction of the lower Nyquist
+KAISER_BETA = 8.6
+BLOCK_FRAMES = 1 << 14
+
+
+@lru_cache(maxsize=32)
+def polyphase_bank(up: int, down: int) -> Tuple[np.ndarray, int]:
+    """Return (bank, half) with bank[phase, k] the taps for input offset k - half."""
+    scale = max(up, down)
+    half_len = ZERO_CROSSINGS * scale  # in samples of the upsampled stream
+    half = ceil(half_len / up)
+    k = np.arange(2 * half + 1)
+    # j: distance (upsampled samples) from each tap to the output instant.
+    j = np.arange(up)[:, None] + (half - k)[None, :] * up
+    fc = ROLLOFF / (2 * scale)
+    h = 2 * fc * np.sinc(2 * fc * j)
+    inside = np.abs(j) <= half_len
+    window = np.i0(KAISER_BETA * np.sqrt(np.clip(1 - (j / half_len) ** 2, 0, None))) / np.i0(KAISER_BETA)
+    bank = np.where(inside, h * window, 0.0) * up  # `up` restores the gain lost to zero-stuffing
+    bank = bank.astype(np.float32)
+    bank.setflags(write=False)
+    return bank, half
+
+
+def _ratio(src: int, dst: int) -> Tuple[int, int]:
+    g = gcd(int(src), int(dst))
+    return dst // g, src // g
+
+
+def _convolve(bank: np.ndarray, padded: np.ndarray, t: np.ndarray, up: int, origin: int = 0) -> np.ndarray:
+    """Output samples at upsampled instants `t`; padded[i - origin] holds padded input index i."""
+    base = t // up - origin  # first tap sits at input index base - half, i.e. padded index base
+    offsets = np.arange(bank.shape[1])
+    frames = padded[base[:, None] + offsets[None, :]]  # (B, K, C)
+    return np.einsum("bk,bkc->bc", bank[t % up], frames, optimize=True)
+
+
+def resample(x: np.ndarray, src: int, dst: int) -> np.ndarray:
+    """Resample (frames,) or (frames, channels) float audio from `src` to `dst` Hz."""
+    if src == dst:
+        return x
+    up, down = _ratio(src, dst)
+    bank, half = polyphase_bank(up, down)
+    mono = x.ndim == 1
+    x2 = np.asarray(x, dtype=np.float32)
+    if mono:
+        x2 = x2[:, None]
+    n = x2.shape[0]
+    m_total = -(-n * up // down)
+    padded = np.zeros((n + 2 * half + 1, x2.shape[1]), dtype=np.float32)
+    padded[half:half + n] = x2
+    out = np.empty((m_total, x2.shape[1]), dtype=np.float32)
+    for start in range(0, m_total, BLOCK_FRAMES):
+        t = np.arange(start, min(start + BLOCK_FRAMES, m_total), dtype=np.int64) * down
+        out[start:start + len(t)] = _convolve(bank, padded, t, up)
+    return out[:, 0] if mono else out
+
+
+def resample_buffer(buf: AudioBuffer, dst: int) -> AudioBuffer:
+    if buf.sample_rate == dst:
+        return buf
+    return AudioBuffer(resample(buf.data, buf.sample_rate, dst), int(dst))
+
+
+class StreamResampler:
+    """Incremental `resample` for (frames, channels) audio fed in pieces.
+
+    `push` returns every output sample whose taps are already covered by the
+    input seen so far and keeps only the last filter span of input; `flush`
+    zero-pads the end exactly as `resample` does. Concatenating the outputs
+    equals resampling the concatenated input in one call.
+    """
+
+    def __init__(self, src: int, dst: int, channels: int):
+        self.src, self.dst = int(src), int(dst)
+        self.up, self.down = _ratio(src, dst)
+        self.bank, self.half = polyphase_bank(self.up, self.down)
+        self._buf = np.zeros((self.half, channels), dtype=np.float32)  # left zero padding
+        self._origin = 0  # padded index of _buf[0]
+        self._received = 0
+        self._m = 0  # next output sample
+
+    def _emit(self, m_end: int) -> np.ndarray:
+        if m_end <= self._m:
+            return np.zeros((0, self._buf.shape[1]), dtype=np.float32)
+        t = np.arange(self._m, m_end, dtype=np.int64) * self.down
+        out = _convolve(self.bank, self._buf, t, self.up, self._origin)
+        self._m = m_end
+        keep_from = (self._m * self.down) // self.up - self._origin
+        self._buf = self._buf[keep_from:]
+        self._origin += keep_from
+        return out
+
+    def push(self, x: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        if self.src == self.dst:
+            return x
+        self._buf = np.concatenate([self._buf, x])
+        self._received += len(x)
+        last = self._origin + len(self._buf) - 2 * self.half - 1  # highest computable base
+        return self._emit(-(-(last + 1) * self.up // self.down) if last >= 0 else 0)
+
+    def flush(self) -> np.ndarray:
+        if self.src == self.dst:
+            return np.zeros((0, self._buf.shape[1]), dtype=np.float32)
+        self._buf = np.concatenate([self._buf, np.zeros((self.half + 1, self._buf.shape[1]), dtype=np.float32)])
+        return self._emit(-(-self._received * self.up // self.down))
@@ -0,0 +1,224 @@
+# backend/services/sfx_library.py
+"""Pre-rendered SFX library.
+
+Every catalog prompt is rendered ahead of time in a few durations and
+variations by a background warm-up pass, and indexed in a JSON file next to
+the job store. Requests that match a library prompt and duration are served
+from the index immediately; anything else falls through to live generation.
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from backend.services.storage_layout import OUTPUT_DIR, layout
+
+APP_ROOT = Path(__file__).resolve().parents[2]
+INDEX_PATH = Path(os.getenv("SFX_LIBRARY_INDEX", str(APP_ROOT / "backend" / "data" / "sfx_library.json")))
+DURATIONS = tuple(int(d) for d in os.getenv("SFX_LIBRARY_DURATIONS", "5,10").split(",") if d.strip())
+VARIATIONS = int(os.getenv("SFX_LIBRARY_VARIATIONS", "2"))
+WARMUP = os.getenv("SFX_LIBRARY_WARMUP", "1") == "1"
+# Warm-up renders procedurally unless the heavy model is explicitly opted in:
+# heavy warm-up competes with live traffic for the admission budget at boot.
+WARMUP_HEAVY = os.getenv("SFX_LIBRARY_WARMUP_HEAVY", "0") == "1"
+REFRESH_S = float(os.getenv("SFX_LIBRARY_REFRESH_S", "0"))  # 0 = warm once at startup
+
+# tone -> prompts. The first four tones drive the video flow's tone analysis.
+CATALOG: Dict[str, List[str]] = {
+    "fear": ["heavy breathing", "distant scream", "heartbeat"],
+    "aggression": ["footsteps", "metal crash", "shouting"],
+    "isolation": ["echoes", "dripping water", "creaking floor"],
+    "neutral": ["soft wind", "low hum", "light static"],
+    "horror": [
+        "distant whisper",
+        "footsteps on old wood",
+        "metal door slam",
+        "wind howling through trees",
+        "low breathing",
+        "creaking floorboards",
+    ],
+}
+
+_log = logging.getLogger("uvicorn.error")
+
+
+def normalize(prompt: str) -> str:
+    return " ".join(prompt.lower().split())
+
+
+def tags_for(prompt: str, tone: str) -> List[str]:
+    return sorted({tone} | {w for w in normalize(prompt).split() if len(w) > 3})
+
+
+@dataclass
+class LibraryEntry:
+    prompt: str
+    tone: str
+    duration: int
+    variation: int
+    generator: str
+    filename: str
+    sample_rate: Optional[int] = None
+    tags: List[str] = field(default_factory=list)
+    created_at: float = 0.0
+
+    @property
+    def key(self) -> Tuple[str, int, int]:
+        return normalize(self.prompt), self.duration, self.variation
+
+
+class SfxLibrary:
+    def __init__(self, index_path: Path = INDEX_PATH):
+        self.index_path = Path(index_path)
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, int, int], LibraryEntry] = {}
+        self.hits = 0
+        self.misses = 0
+        self.warming = False
+        self.last_warm: Optional[float] = None
+        self._load()
+
+    # Index -------------------------------------------------------------------
+
+    def _load(self) -> None:
+        try:
+            raw = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            return
+        for item in raw.get("entries", []):
+            try:
+                entry = LibraryEntry(**item)
+            except TypeError:
+                continue
+            if layout.resolve(entry.filename) is not None:
+                self._entries[entry.key] = entry
+
+    def _save_locked(self) -> None:
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": 1, "entries": [asdict(e) for e in self._entries.values()]}, indent=1))
+        os.replace(tmp, self.index_path)
+
+    # Lookup ------------------------------------------------------------------
+
+    def match(self, prompt: str, duration: int, sample_rate: Optional[int] = None, policy: str = "auto") -> Optional[LibraryEntry]:
+        """A random variation rendered for exactly this prompt and duration, if any."""
+        norm = normalize(prompt)
+        with self._lock:
+            found = [
+                e for k, e in self._entries.items()
+                if k[0] == norm and k[1] == duration
+                and (sample_rate is None or e.sample_rate == sample_rate)
+                and (policy == "auto" or e.generator == policy)
+            ]
+            heavy = [e for e in found if e.generator == "heavy"]
+            pick = random.choice(heavy or found) if found else None
+            if pick is not None and layout.resolve(pick.filename) is None:
+                self._entries.pop(pick.key, None)
+                pick = None
+            if pick is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return pick
+
+    def entries(self, tone: Optional[str] = None, tag: Optional[str] = None, duration: Optional[int] = None) -> List[LibraryEntry]:
+        tag = tag.lower() if tag else None
+        with self._lock:
+            found = [
+                e for e in self._entries.values()
+                if (tone is None or e.tone == tone)
+                and (tag is None or tag in e.tags)
+                and (duration is None or e.duration == duration)
+            ]
+        return sorted(found, key=lambda e: (e.tone, e.prompt, e.duration, e.variation))
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            planned = sum(len(p) for p in CATALOG.values()) * len(DURATIONS) * max(1, VARIATIONS)
+            return {
+                "entries": len(self._entries),
+                "planned": planned,
+                "hits": self.hits,
+                "misses": self.misses,
+                "warming": self.warming,
+                "last_warm": self.last_warm,
+            }
+
+    # Warm-up -----------------------------------------------------------------
+
+    def _pending(self, upgrade: bool) -> List[Tuple[str, str, int, int]]:
+        todo = []
+        with self._lock:
+            for tone, prompts in CATALOG.items():
+                for prompt in prompts:
+                    for duration in DURATIONS:
+                        for variation in range(max(1, VARIATIONS)):
+                            e = self._entries.get((normalize(prompt), duration, variation))
+                            if e is None or (upgrade and e.generator != "heavy"):
+                                todo.append((tone, prompt, duration, variation))
+        return todo
+
+    def warm(self) -> int:
+        """Render every missing catalog entry. Returns the number rendered.
+
+        With SFX_LIBRARY_WARMUP_HEAVY=1 entries may use the heavy model, and
+        procedural ones are re-rendered once it is available; otherwise every
+        entry is rendered by the procedural generator.
+        """
+        from backend.services import pipeline
+        from backend.services.heavy_worker import backend as heavy_backend
+
+        upgrade = WARMUP_HEAVY and os.getenv("USE_HEAVY", "0") == "1" and heavy_backend().is_ready()
+        policy = "auto" if WARMUP_HEAVY else "fallback"
+        rendered = 0
+        self.warming = True
+        try:
+            for tone, prompt, duration, variation in self._pending(upgrade):
+                try:
+                    result = pipeline.generate(prompt, duration, None, policy, variation=variation, use_library=False)
+                except Exception as e:  # noqa: BLE001
+                    _log.warning(f"[LIBRARY] render failed for {prompt!r} ({duration}s): {e}")
+                    continue
+                entry = LibraryEntry(
+                    prompt=prompt,
+                    tone=tone,
+                    duration=duration,
+                    variation=variation,
+                    generator=result["generator"],
+                    filename=Path(result["path"]).name,
+                    sample_rate=result.get("sample_rate"),
+                    tags=tags_for(prompt, tone),
+                    created_at=time.time(),
+                )
+                with self._lock:
+                    self._entries[entry.key] = entry
+                    self._save_locked()
+                rendered += 1
+        finally:
+            self.warming = False
+            self.last_warm = time.time()
+        if rendered:
+            _log.info(f"[LIBRARY] rendered {rendered} library clips")
+        return rendered
+
+    def start_warmup(self, interval_s: float = REFRESH_S) -> threading.Thread:
+        """Warm in the background now, then every `interval_s` seconds if > 0."""
+        def loop() -> None:
+            while True:
+                self.warm()
+                if interval_s <= 0:
+                    return
+                time.sleep(interval_s)
+
+        t = threading.Thread(target=loop, name="sfx-library-warmup", daemon=True)
+        t.start()
+        return t
+
+
+library = SfxLibrary()
@@ -0,0 +1,96 @@
+# backend/services/singleflight.py
+"""Single-flight coalescing of identical concurrent generations.
+
+The first request for a fingerprint becomes the leader and runs the
+generation; requests with the same fingerprint that arrive before it
+finishes wait on the same future and receive the same result (and file).
+The shared generation is canceled only once every waiter has gone away.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+from backend.services.context import GenerationContext
+
+
+def fingerprint(prompt: str, duration: int, sample_rate: Optional[int], policy: str, loop: bool = False) -> str:
+    """Canonical key for requests that must produce interchangeable output."""
+    canon = {
+        "prompt": " ".join(prompt.split()),
+        "duration": int(duration),
+        "sample_rate": sample_rate,
+        "policy": policy,
+        "loop": bool(loop),
+    }
+    return hashlib.sha256(json.dumps(canon, sort_keys=True).encode()).hexdigest()
+
+
+class Flight:
+    def __init__(self, group: "SingleFlight", key: str):
+        self._group = group
+        self.key = key
+        self.future: Future = Future()
+        self.ctx = GenerationContext()
+        self.waiters = 1
+
+    def leave(self) -> None:
+        """A waiter gave up; cancel the work if nobody is left to receive it.
+
+        An abandoned flight is unregistered at once, so a request arriving
+        while the canceled call unwinds leads a fresh one instead of joining
+        (and inheriting the cancellation of) the dying one.
+        """
+        group = self._group
+        with group._lock:
+            self.waiters -= 1
+            abandoned = self.waiters <= 0 and not self.future.done()
+            if abandoned and group._flights.get(self.key) is self:
+                del group._flights[self.key]
+        if abandoned:
+            self.ctx.cancel()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def join(self, key: str) -> Tuple[Flight, bool]:
+        """Return the in-flight call for `key` (or a new one) and whether we lead it."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = Flight(self, key)
+            self.leaders += 1
+            return flight, True
+
+    def execute(self, flight: Flight, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """Run `fn` as the leader and publish its outcome to every waiter."""
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:  # noqa: BLE001
+            self._finish(flight)
+            flight.future.set_exception(e)
+            return
+        self._finish(flight)
+        flight.future.set_result(result)
+
+    def _finish(self, flight: Flight) -> None:
+        # Later arrivals start a fresh call instead of joining a finished one.
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._flights), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+flights = SingleFlight()
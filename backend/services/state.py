@@ -2,17 +2,10 @@
 from __future__ import annotations
 import os
 import time
-from collections import deque
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import Deque, Dict, Any
 
 START_TIME = time.time()
-RECENT: Deque[Dict[str, Any]] = deque(maxlen=10)
-
-
-def record_generation(entry: Dict[str, Any]) -> None:
-    RECENT.appendleft(entry)
 
 
 def uptime_seconds() -> int:
@@ -0,0 +1,246 @@
+# backend/services/storage.py
+"""Pluggable storage for generated audio.
+
+Every render is written to the local sharded layout first and then handed
+to the configured backend with `commit(path)`:
+
+- local: the layout is the store (single pod or shared volume).
+- s3:    files are also uploaded to an S3-compatible bucket (AWS, MinIO,
+         R2...) with multipart transfers, so any pod can serve any render.
+         Reads are either redirected to a presigned URL or proxied through a
+         local read-through cache that fills the same layout on a miss.
+         A failed upload raises StorageError after the local commit; the
+         file stays served from this pod and is retried in the background
+         every S3_RETRY_S until it lands.
+
+STORAGE_BACKEND=local|s3; the s3 backend needs boto3 and S3_BUCKET, plus
+S3_ENDPOINT_URL for non-AWS endpoints.
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import RedirectResponse, Response
+
+from backend.services.file_serving import file_response
+from backend.services.storage_layout import ShardedLayout, layout as default_layout
+
+BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "audio/")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION") or None
+READ_MODE = os.getenv("STORAGE_READ_MODE", "proxy").lower()  # proxy | presign
+PRESIGN_TTL_S = int(os.getenv("STORAGE_PRESIGN_TTL_S", "3600"))
+MULTIPART_MB = int(os.getenv("S3_MULTIPART_MB", "8"))
+RETRY_S = float(os.getenv("S3_RETRY_S", "30"))
+
+_log = logging.getLogger("uvicorn.error")
+
+
+class StorageError(RuntimeError):
+    """The storage backend is misconfigured or unreachable."""
+
+
+class LocalStorage:
+    name = "local"
+
+    def __init__(self, layout: ShardedLayout = default_layout):
+        self.layout = layout
+
+    def commit(self, path: Path) -> None:
+        self.layout.commit(path)
+
+    def local_path(self, name: str) -> Optional[Path]:
+        path = self.layout.resolve(name)
+        return path if path is not None and path.is_file() else None
+
+    def serve(self, request: Request, name: str) -> Response:
+        path = self.local_path(name)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return file_response(request, path)
+
+    def stats(self) -> Dict[str, Any]:
+        files, total = self.layout.usage()
+        return {"backend": self.name, "local_files": files, "local_bytes": total}
+
+
+class S3Storage(LocalStorage):
+    """S3-compatible bucket with the local layout as a read-through cache."""
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = S3_PREFIX,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+        region: Optional[str] = S3_REGION,
+        read_mode: str = READ_MODE,
+        layout: ShardedLayout = default_layout,
+        client: Any = None,
+    ):
+        super().__init__(layout)
+        if not bucket:
+            raise StorageError("S3_BUCKET is required for STORAGE_BACKEND=s3")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.read_mode = read_mode
+        try:
+            import boto3  # type: ignore
+            from boto3.s3.transfer import TransferConfig  # type: ignore
+        except ImportError as e:
+            if client is None:
+                raise StorageError("boto3 is required for STORAGE_BACKEND=s3") from e
+            boto3 = TransferConfig = None  # injected client (tests, MinIO stand-ins)
+        self._client = client or boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        chunk = MULTIPART_MB * 1024 * 1024
+        self._xfer = {"Config": TransferConfig(multipart_threshold=chunk, multipart_chunksize=chunk)} if TransferConfig else {}
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self._fetch_guard = threading.Lock()
+        self._pending: Dict[str, Path] = {}
+        self._pending_lock = threading.Lock()
+        self._retrier: Optional[threading.Thread] = None
+        self.uploads = 0
+        self.upload_failures = 0
+        self.cache_hits = 0
+        self.cache_fills = 0
+
+    def key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    def commit(self, path: Path) -> None:
+        """Record locally, then stream the file to the bucket (multipart above the threshold).
+
+        On StorageError the local copy is committed and queued for retry.
+        """
+        super().commit(path)
+        path = Path(path)
+        try:
+            self._upload(path)
+        except StorageError:
+            with self._pending_lock:
+                self._pending[path.name] = path
+                self.upload_failures += 1
+                if self._retrier is None or not self._retrier.is_alive():
+                    self._retrier = threading.Thread(target=self._retry_loop, name="s3-upload-retry", daemon=True)
+                    self._retrier.start()
+            raise
+
+    def _upload(self, path: Path) -> None:
+        try:
+            self._client.upload_file(
+                str(path), self.bucket, self.key(path.name),
+                ExtraArgs={"ContentType": "audio/wav" if path.suffix == ".wav" else "application/octet-stream"},
+                **self._xfer,
+            )
+        except Exception as e:  # noqa: BLE001
+            raise StorageError(f"upload {path.name} failed: {e}") from e
+        self.uploads += 1
+
+    def _retry_loop(self) -> None:
+        while True:
+            time.sleep(RETRY_S)
+            with self._pending_lock:
+                pending = list(self._pending.items())
+                if not pending:
+                    self._retrier = None
+                    return
+            failed = 0
+            for name, path in pending:
+                if not path.is_file():  # evicted locally; nothing left to upload
+                    _log.error(f"[STORAGE] {name} was never uploaded and is gone locally")
+                else:
+                    try:
+                        self._upload(path)
+                    except StorageError:
+                        failed += 1
+                        continue
+                with self._pending_lock:
+                    self._pending.pop(name, None)
+            if failed:
+                _log.warning(f"[STORAGE] {failed} upload(s) still failing; retrying in {RETRY_S:g}s")
+
+    def _fetch(self, name: str) -> Optional[Path]:
+        """Download `name` into the local layout (one download per name at a time)."""
+        with self._fetch_guard:
+            lock = self._fetch_locks.setdefault(name, threading.Lock())
+        try:
+            with lock:
+                return self._fetch_locked(name)
+        finally:
+            with self._fetch_guard:
+                self._fetch_locks.pop(name, None)
+
+    def _fetch_locked(self, name: str) -> Optional[Path]:
+        path = super().local_path(name)
+        if path is not None:
+            return path
+        dst = self.layout.path_for(name)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(f".{name}.part")
+        try:
+            self._client.download_file(self.bucket, self.key(name), str(tmp), **self._xfer)
+        except Exception as e:  # noqa: BLE001
+            tmp.unlink(missing_ok=True)
+            if _is_not_found(e):
+                return None
+            raise StorageError(f"fetch {name} failed: {e}") from e
+        os.replace(tmp, dst)
+        self.layout.commit(dst)
+        self.cache_fills += 1
+        return dst
+
+    def local_path(self, name: str) -> Optional[Path]:
+        path = super().local_path(name)
+        if path is not None:
+            self.cache_hits += 1
+            return path
+        return self._fetch(name)
+
+    def serve(self, request: Request, name: str) -> Response:
+        if self.read_mode == "presign" and super().local_path(name) is None:
+            url = self._client.generate_presigned_url(
+                "get_object", Params={"Bucket": self.bucket, "Key": self.key(name)}, ExpiresIn=PRESIGN_TTL_S
+            )
+            return RedirectResponse(url, status_code=307)
+        try:
+            return super().serve(request, name)
+        except StorageError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "bucket": self.bucket,
+            "read_mode": self.read_mode,
+            "uploads": self.uploads,
+            "upload_failures": self.upload_failures,
+            "pending_uploads": len(self._pending),
+            "cache_hits": self.cache_hits,
+            "cache_fills": self.cache_fills,
+        }
+
+
+def _is_not_found(e: Exception) -> bool:
+    response = getattr(e, "response", None) or {}
+    code = str(response.get("Error", {}).get("Code", ""))
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+def _make_storage() -> LocalStorage:
+    if BACKEND == "s3":
+        try:
+            return S3Storage(S3_BUCKET)
+        except StorageError as e:
+            _log.error(f"[STORAGE] {e}; falling back to local storage")
+    return LocalStorage()
+
+
+storage = _make_storage()
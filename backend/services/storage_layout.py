@@ -0,0 +1,193 @@
+# backend/services/storage_layout.py
+"""Sharded on-disk layout for generated audio.
+
+Files live at <root>/<h0h1>/<h2h3>/<name>, where h is a BLAKE2b digest of
+the file name, so no directory grows past a few hundred entries. URLs keep
+using the bare name (/audio/<name>): the shard is a pure function of it.
+A SQLite manifest in the root records every committed file with its size,
+so existence checks, counts and disk usage never walk the tree. Files from
+the old flat layout still resolve until migrated:
+
+    python -m backend.services.storage_layout migrate [--root DIR] [--dry-run]
+    python -m backend.services.storage_layout reindex [--root DIR]
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+APP_ROOT = Path(__file__).resolve().parents[2]
+OUTPUT_DIR = APP_ROOT / "backend" / "output_audio"
+MANIFEST_NAME = ".manifest.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name        TEXT PRIMARY KEY,
+    relpath     TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL
+);
+"""
+
+
+def shard_of(name: str) -> Tuple[str, str]:
+    h = hashlib.blake2b(name.encode(), digest_size=2).hexdigest()
+    return h[:2], h[2:]
+
+
+class ShardedLayout:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _forget_connection(self) -> None:
+        """A forked child opens its own connection; SQLite handles must not cross fork()."""
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module never touches the disk.
+        if self._db is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.root / MANIFEST_NAME), check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    # Paths -------------------------------------------------------------------
+
+    def path_for(self, name: str) -> Path:
+        a, b = shard_of(name)
+        return self.root / a / b / name
+
+    def new_path(self, suffix: str = ".wav") -> Path:
+        """A fresh uuid-named path in its shard (parent directories created)."""
+        path = self.path_for(f"{uuid.uuid4()}{suffix}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def resolve(self, name: str) -> Optional[Path]:
+        """Locate `name`: manifest first, then its shard, then the legacy flat root."""
+        with self._lock:
+            row = self._conn().execute("SELECT relpath FROM files WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            return self.root / row[0]
+        for path in (self.path_for(name), self.root / name):
+            if path.is_file():
+                return path
+        return None
+
+    # Manifest ----------------------------------------------------------------
+
+    def commit(self, path: Path) -> None:
+        """Record a finished file (idempotent)."""
+        path = Path(path)
+        size = path.stat().st_size
+        with self._lock:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO files (name, relpath, size, created_at) VALUES (?, ?, ?, ?)",
+                (path.name, str(path.relative_to(self.root)), size, time.time()),
+            )
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            self._conn().execute("DELETE FROM files WHERE name = ?", (name,))
+
+    def exists(self, name: str) -> bool:
+        with self._lock:
+            return self._conn().execute("SELECT 1 FROM files WHERE name = ?", (name,)).fetchone() is not None
+
+    def usage(self) -> Tuple[int, int]:
+        """(file count, total bytes) from the manifest."""
+        with self._lock:
+            n, total = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+        return int(n), int(total)
+
+    # Maintenance -------------------------------------------------------------
+
+    def _flat_files(self) -> Iterator[Path]:
+        for entry in os.scandir(self.root):
+            if entry.is_file() and not entry.name.startswith("."):
+                yield Path(entry.path)
+
+    def migrate(self, dry_run: bool = False) -> Tuple[int, int]:
+        """Move flat files into their shards. Returns (moved, skipped)."""
+        moved = skipped = 0
+        for src in self._flat_files():
+            dst = self.path_for(src.name)
+            if dst.exists():
+                skipped += 1
+                continue
+            if not dry_run:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(src, dst)
+                self.commit(dst)
+            moved += 1
+        return moved, skipped
+
+    def reindex(self) -> int:
+        """Rebuild the manifest from the files on disk. Returns the file count."""
+        with self._lock:
+            self._conn().execute("DELETE FROM files")
+        count = 0
+        for dirpath, _, files in os.walk(self.root):
+            for f in files:
+                if not f.startswith("."):
+                    self.commit(Path(dirpath) / f)
+                    count += 1
+        return count
+
+
+_layouts: Dict[Path, ShardedLayout] = {}
+_layouts_lock = threading.Lock()
+
+
+def layout_for(root: Path) -> ShardedLayout:
+    """The shared layout for `root` (one manifest connection per root per process)."""
+    root = Path(root)
+    with _layouts_lock:
+        found = _layouts.get(root)
+        if found is None:
+            found = _layouts[root] = ShardedLayout(root)
+        return found
+
+
+def _after_fork_in_child() -> None:
+    global _layouts_lock
+    _layouts_lock = threading.Lock()
+    for shared in _layouts.values():
+        shared._forget_connection()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+layout = layout_for(OUTPUT_DIR)
+
+
+def main(argv: Optional[list] = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m backend.services.storage_layout")
+    ap.add_argument("command", choices=["migrate", "reindex"])
+    ap.add_argument("--root", type=Path, default=OUTPUT_DIR)
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args(argv)
+    target = ShardedLayout(args.root)
+    if args.command == "migrate":
+        moved, skipped = target.migrate(dry_run=args.dry_run)
+        verb = "would move" if args.dry_run else "moved"
+        print(f"{verb} {moved} files into shards under {args.root} ({skipped} skipped: already sharded)")
+    else:
+        print(f"indexed {target.reindex()} files under {args.root}")
+
+
+if __name__ == "__main__":
+    main()
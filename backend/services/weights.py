@@ -0,0 +1,181 @@
+# backend/services/weights.py
+"""Memory-mapped AudioGen weights.
+
+With HEAVY_WEIGHTS=mmap the first load exports the model's checkpoints
+(LM and compression model) from the HF cache to safetensors files under
+HEAVY_WEIGHTS_DIR. Every later load maps those files and builds tensors
+directly on the mapping (`torch.frombuffer`), so weights are paged in on
+demand and every process on the host shares one copy in the page cache
+instead of each unpickling its own. The mapping is copy-on-write: a stray
+in-place write costs one private page, never a corrupted file.
+
+The export is done once per host under a file lock; files are written to a
+temporary name and renamed, so concurrent workers never map a partial file.
+"""
+from __future__ import annotations
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import warnings
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+APP_ROOT = Path(__file__).resolve().parents[2]
+MODE = os.getenv("HEAVY_WEIGHTS", "hub").lower()  # hub | mmap
+WEIGHTS_DIR = Path(os.getenv("HEAVY_WEIGHTS_DIR", str(APP_ROOT / "backend" / "data" / "weights")))
+
+_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+_log = logging.getLogger("uvicorn.error")
+_maps: List[mmap.mmap] = []
+_info: Dict[str, Any] = {}
+
+
+def enabled() -> bool:
+    return MODE == "mmap"
+
+
+def model_dir(model_name: str) -> Path:
+    return WEIGHTS_DIR / model_name.replace("/", "--")
+
+
+def mmap_state_dict(path: Path) -> Dict[str, Any]:
+    """Tensors of a safetensors file, each a view onto one shared mapping."""
+    import torch
+
+    with open(path, "rb") as f:
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    _maps.append(mm)
+    base = 8 + header_len
+    tensors: Dict[str, Any] = {}
+    for name, meta in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = getattr(torch, _DTYPES[meta["dtype"]])
+        start, end = meta["data_offsets"]
+        shape = meta["shape"]
+        if end == start:
+            tensors[name] = torch.empty(shape, dtype=dtype)
+            continue
+        itemsize = torch.empty((), dtype=dtype).element_size()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            t = torch.frombuffer(mm, dtype=dtype, count=(end - start) // itemsize, offset=base + start)
+        tensors[name] = t.reshape(shape)
+    return tensors
+
+
+def _save(state: Dict[str, Any], path: Path) -> None:
+    from safetensors.torch import save_file  # type: ignore
+
+    seen = set()
+    tensors = {}
+    for name, t in state.items():
+        t = t.detach().cpu().contiguous()
+        ptr = t.data_ptr()
+        if ptr in seen:  # safetensors refuses aliased tensors; store a copy
+            t = t.clone()
+        seen.add(ptr)
+        tensors[name] = t
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    save_file(tensors, str(tmp))
+    os.replace(tmp, path)
+
+
+def _cfg_yaml(cfg: Any) -> str:
+    from omegaconf import OmegaConf  # type: ignore
+    return cfg if isinstance(cfg, str) else OmegaConf.to_yaml(OmegaConf.create(cfg))
+
+
+def export(model_name: str) -> Path:
+    """Write <dir>/{lm,compression}.{safetensors,yaml} once (idempotent, locked)."""
+    from audiocraft.models import loaders  # type: ignore
+
+    root = model_dir(model_name)
+    done = root / "export.json"
+    if done.exists():
+        return root
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if done.exists():  # another process finished while we waited
+            return root
+        t0 = time.time()
+        parts = {}
+        for part, load_ckpt in (("lm", loaders.load_lm_model_ckpt), ("compression", loaders.load_compression_model_ckpt)):
+            pkg = load_ckpt(model_name)
+            if "pretrained" in pkg:
+                parts[part] = {"pretrained": pkg["pretrained"]}
+                continue
+            _save(pkg["best_state"], root / f"{part}.safetensors")
+            (root / f"{part}.yaml").write_text(_cfg_yaml(pkg["xp.cfg"]))
+            parts[part] = {"file": f"{part}.safetensors"}
+            del pkg
+        done.write_text(json.dumps({"model": model_name, "parts": parts, "export_s": round(time.time() - t0, 2)}))
+    _log.info(f"[WEIGHTS] exported {model_name} to {root}")
+    return root
+
+
+def _build(root: Path, part: str, builder) -> Any:
+    from omegaconf import OmegaConf  # type: ignore
+
+    cfg = OmegaConf.create((root / f"{part}.yaml").read_text())
+    cfg.device = "cpu"
+    if part == "lm":
+        cfg.dtype = "float32"
+    model = builder(cfg)
+    # assign=True swaps the freshly initialised parameters for the mapped ones.
+    model.load_state_dict(mmap_state_dict(root / f"{part}.safetensors"), assign=True)
+    model.eval()
+    model.cfg = cfg
+    return model
+
+
+def load_audiogen(model_name: str) -> Any:
+    """Build an AudioGen on CPU whose weights are views onto mapped safetensors."""
+    from audiocraft.models import AudioGen, builders, loaders  # type: ignore
+
+    t0 = time.time()
+    root = export(model_name)
+    parts = json.loads((root / "export.json").read_text())["parts"]
+    lm = _build(root, "lm", builders.get_lm_model)
+    if "pretrained" in parts["compression"]:
+        compression = loaders.load_compression_model(model_name, device="cpu")
+    else:
+        compression = _build(root, "compression", builders.get_compression_model)
+    _info.update({
+        "mode": "mmap",
+        "dir": str(root),
+        "mapped_bytes": sum(len(m) for m in _maps),
+        "load_s": round(time.time() - t0, 2),
+    })
+    return AudioGen(model_name, compression, lm)
+
+
+def record_fallback(error: Exception) -> None:
+    _log.warning(f"[WEIGHTS] mmap load failed, loading from the hub cache: {error}")
+    _info.update({"mode": "hub", "mmap_error": str(error)})
+
+
+def info() -> Dict[str, Any]:
+    return dict(_info) or {"mode": MODE, "dir": str(WEIGHTS_DIR) if enabled() else None}
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Pre-export at image build time: python -m backend.services.weights [model]."""
+    import sys
+    args = sys.argv[1:] if argv is None else argv
+    print(export(args[0] if args else "facebook/audiogen-medium"))
+
+
+if __name__ == "__main__":
+    main()
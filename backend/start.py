@@ -1,6 +1,8 @@
 # backend/start.py
 from __future__ import annotations
+import gc
 import os
+import signal
 import sys
 import logging
 
@@ -11,7 +13,7 @@ def _log(msg: str) -> None:
     logging.getLogger("uvicorn.error").info(msg)
 
 
-def _diagnostics():
+def _diagnostics() -> bool:
     import platform
     torch = None
     audiocraft = None
@@ -34,12 +36,54 @@ def _diagnostics():
     _log(f"USE_HEAVY={os.getenv('USE_HEAVY','0')} ALLOW_FALLBACK={os.getenv('ALLOW_FALLBACK','1')}")
     _log(f"Build tag: {os.getenv('BUILD_TAG')}  Image tag: {os.getenv('IMAGE_TAG')}  GIT_SHA: {os.getenv('GIT_SHA')}")
     _log(f"torch={getattr(torch,'__version__',None)}  audiocraft={getattr(audiocraft,'__version__',None)}  cuda_available={cuda_available}  cuda_runtime={cuda_runtime}")
+    return cuda_available
+
+
+def _serve_forked(workers: int, host: str, port: int) -> None:
+    """Load-then-fork: children inherit the loaded app and model copy-on-write.
+
+    With HEAVY_WEIGHTS=mmap the weights are file-backed pages, so N workers
+    share one copy; gc.freeze() keeps the collector from touching (and so
+    copying) the parent's objects in every child. CPU and in-process model
+    only: a CUDA context does not survive fork(), and an isolated model
+    process would be spawned (and loaded) once per child. The parent never runs the app's startup hooks
+    and opens no SQLite handle; child 0 is the primary (PRIMARY_WORKER=1)
+    that recovers interrupted jobs and warms the library, every child runs
+    the jobs it accepts.
+    """
+    config = uvicorn.Config("backend.main:app", host=host, port=port, log_level="info")
+    sock = config.bind_socket()
+    gc.freeze()
+    children = []
+    for i in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.environ["PRIMARY_WORKER"] = "1" if i == 0 else "0"
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        children.append(pid)
+    _log(f"Forked {workers} workers after preload: {children}")
+
+    def _forward(signum, _frame):
+        for pid in children:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, _forward)
+    signal.signal(signal.SIGTERM, _forward)
+    for pid in children:
+        os.waitpid(pid, 0)
 
 
 if __name__ == "__main__":
     from backend import main as mainmod
+    from backend.services import heavy_worker
 
-    _diagnostics()
+    cuda_available = _diagnostics()
 
     use_heavy = os.getenv("USE_HEAVY", "0") == "1"
     allow_fallback = os.getenv("ALLOW_FALLBACK", "1") == "1"
@@ -81,4 +125,16 @@ if __name__ == "__main__":
     except Exception:
         pass
 
-    uvicorn.run("backend.main:app", host="0.0.0.0", port=int(os.getenv("PORT", "8000")), log_level="info")
+    port = int(os.getenv("PORT", "8000"))
+    workers = int(os.getenv("WEB_WORKERS", "1"))
+    if workers > 1 and use_heavy and cuda_available:
+        _log(f"WEB_WORKERS={workers} ignored: the model is on CUDA, which does not survive fork(); serving 1 worker")
+        workers = 1
+    if workers > 1 and use_heavy and heavy_worker.enabled():
+        _log(f"WEB_WORKERS={workers} ignored: with HEAVY_ISOLATION=process every worker would spawn "
+             "its own model process; serving 1 worker")
+        workers = 1
+    if workers > 1 and hasattr(os, "fork"):
+        _serve_forked(workers, "0.0.0.0", port)
+    else:
+        uvicorn.run("backend.main:app", host="0.0.0.0", port=port, log_level="info")
@@ -0,0 +1,113 @@
+# backend/tests/test_job_recovery.py
+"""Crash recovery across job owners: claims, heartbeats and forwarded cancels."""
+from __future__ import annotations
+import json
+import socket
+import subprocess
+import time
+
+import pytest
+
+from backend.services import job_processor as jobs
+from backend.services.job_store import JobStore
+
+PARAMS = {"prompt": "rain", "duration": 1, "sample_rate": None, "policy": "fallback", "timeout_s": None, "loop": False}
+HOST = socket.gethostname()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    db = JobStore(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(jobs, "_store", db)
+    # recover() fills the in-memory queue; start each test from an empty one, with no workers.
+    monkeypatch.setattr(jobs, "_queue", type(jobs._queue)())
+    monkeypatch.setattr(jobs, "_params", {})
+    monkeypatch.setattr(jobs, "_running", {})
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def live_pid():
+    proc = subprocess.Popen(["sleep", "60"])
+    yield proc.pid
+    proc.kill()
+    proc.wait()
+
+
+@pytest.fixture
+def dead_pid():
+    proc = subprocess.Popen(["true"])
+    proc.wait()
+    return proc.pid
+
+
+def _row(db: JobStore, job_id: str):
+    return next(r for r in db.unfinished() if r["job_id"] == job_id)
+
+
+def test_claim_is_compare_and_set(store):
+    store.insert("j", PARAMS, {"status": "running"}, "host:1:old")
+    assert store.claim("j", "host:1:old", "host:2:new")
+    assert not store.claim("j", "host:1:old", "host:3:late")  # lost the race
+    assert _row(store, "j")["owner"] == "host:2:new"
+
+
+def test_recover_claims_a_dead_owners_row(store, dead_pid):
+    store.insert("dead", PARAMS, {"status": "running"}, f"{HOST}:{dead_pid}:x")
+    assert jobs.recover() == 1
+    assert list(jobs._queue) == ["dead"]
+    assert _row(store, "dead")["owner"] == jobs.owner_id()
+    assert store.get("dead")["recovered"] is True
+
+
+def test_recover_skips_a_live_owners_row(store, live_pid):
+    store.insert("live", PARAMS, {"status": "queued"}, f"{HOST}:{live_pid}:x")
+    store.insert("remote", PARAMS, {"status": "running"}, "elsewhere:1:x")
+    assert jobs.recover() == 0
+    assert not jobs._queue
+    assert _row(store, "live")["owner"] == f"{HOST}:{live_pid}:x"
+
+
+def test_recover_takes_over_a_stale_heartbeat(store, live_pid, monkeypatch):
+    store.insert("stale", PARAMS, {"status": "running"}, f"{HOST}:{live_pid}:x")
+    store.insert("fresh", PARAMS, {"status": "running"}, "elsewhere:1:x")
+    monkeypatch.setattr(jobs, "JOB_STALE_S", 30.0)
+    store._db.execute("UPDATE jobs SET heartbeat = ? WHERE job_id = 'stale'", (time.time() - 60,))
+    assert jobs.recover() == 1
+    assert list(jobs._queue) == ["stale"]
+
+
+def test_heartbeat_keeps_own_rows_fresh(store):
+    store.insert("mine", PARAMS, {"status": "queued"}, "host:1:me")
+    store._db.execute("UPDATE jobs SET heartbeat = 0")
+    assert store.heartbeat("host:1:me") == 1
+    assert time.time() - _row(store, "mine")["heartbeat"] < 5
+
+
+def test_rows_without_an_owner_are_recovered(store):
+    store._db.execute(
+        "INSERT INTO jobs (job_id, status, params, state, created_at, updated_at)"
+        " VALUES ('legacy', 'running', ?, '{}', 1, 1)",
+        (json.dumps(PARAMS),),
+    )
+    assert jobs.recover() == 1
+
+
+def test_cancel_is_forwarded_to_the_owner(store):
+    store.insert("q", PARAMS, {"status": "queued"}, "host:1:peer")
+    store.insert("done", PARAMS, {"status": "queued"}, "host:1:peer")
+    store.update({"job_id": "done", "status": "done"})
+
+    assert store.request_cancel("q")
+    assert not store.request_cancel("done")
+    assert not store.request_cancel("missing")
+    assert store.take_cancel_requests("host:2:other") == []
+    assert store.take_cancel_requests("host:1:peer") == ["q"]
+    assert store.take_cancel_requests("host:1:peer") == []  # taken once
+
+
+def test_cancel_of_a_foreign_job_goes_through_the_store(store):
+    store.insert("foreign", PARAMS, {"status": "running"}, "host:1:peer")
+    assert jobs.cancel("foreign")
+    assert store.take_cancel_requests("host:1:peer") == ["foreign"]
@@ -0,0 +1,85 @@
+# backend/tests/test_storage.py
+"""S3 upload failures keep the local render servable and are retried."""
+from __future__ import annotations
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.services import pipeline, storage
+from backend.services.storage_layout import layout_for
+
+
+class StubS3:
+    """Minimal boto3 S3 client: upload_file goes through put_object, which can be made to fail."""
+
+    def __init__(self):
+        self.objects = {}
+        self.fail = True
+        self.downloads = 0
+        self.uploaded = threading.Event()
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        if self.fail:
+            raise ConnectionError("endpoint unreachable")
+        self.objects[(Bucket, Key)] = Body
+        self.uploaded.set()
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None, **kwargs):
+        with open(Filename, "rb") as f:
+            self.put_object(Bucket=Bucket, Key=Key, Body=f.read(), **(ExtraArgs or {}))
+
+    def download_file(self, Bucket, Key, Filename, **kwargs):
+        self.downloads += 1
+        raise AssertionError("a pending upload must be served from the local copy")
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "RETRY_S", 0.05)
+    monkeypatch.setattr(pipeline, "OUTPUT_DIR", tmp_path)
+    backend = storage.S3Storage("bucket", layout=layout_for(tmp_path), client=StubS3())
+    monkeypatch.setattr(pipeline, "storage", backend)
+    yield backend
+    with backend._pending_lock:  # let a still-sleeping retry thread exit quietly
+        backend._pending.clear()
+
+
+def test_failed_upload_is_served_locally_and_retried(s3):
+    result = pipeline.generate("soft wind", 1, None, "fallback", use_library=False)
+    name = result["url"].rsplit("/", 1)[1]
+
+    assert result["upload_pending"] is True
+    assert s3.upload_failures == 1
+    assert s3.stats()["pending_uploads"] == 1
+
+    app = FastAPI()
+
+    @app.get("/audio/{name}")
+    def audio(name: str, request: Request):
+        return s3.serve(request, name)
+
+    with TestClient(app) as client:
+        r = client.get(f"/audio/{name}")
+    assert r.status_code == 200
+    assert r.content == s3.layout.resolve(name).read_bytes()
+    assert s3._client.downloads == 0
+
+    s3._client.fail = False
+    assert s3._client.uploaded.wait(5)
+    deadline = time.time() + 5
+    while s3.stats()["pending_uploads"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert s3.stats()["pending_uploads"] == 0
+    assert ("bucket", s3.key(name)) in s3._client.objects
+    assert s3.uploads == 1
+
+
+def test_commit_wraps_upload_errors(s3):
+    path = s3.layout.new_path(".wav")
+    path.write_bytes(b"RIFF")
+    with pytest.raises(storage.StorageError):
+        s3.commit(path)
+    assert s3.layout.exists(path.name)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Middleware overhead on file downloads and small JSON responses.
+
+Drives the ASGI app in-process (no sockets, no HTTP client) so the only
+difference between variants is the middleware stack:
+
+  none  - no timing middleware
+  base  - the old `@app.middleware("http")` timing middleware (BaseHTTPMiddleware)
+  asgi  - backend.middleware.RequestContextMiddleware
+
+    python scripts/bench_middleware.py [--size-mb 64] [--downloads 20] [--json 2000]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from backend.middleware import RequestContextMiddleware  # noqa: E402
+from backend.services.file_serving import file_response  # noqa: E402
+
+
+def build_app(variant: str, path: Path) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/audio/file.wav")
+    def audio(request: Request):
+        return file_response(request, path)
+
+    @app.get("/api/ping")
+    def ping():
+        return {"ok": True}
+
+    if variant == "base":
+        @app.middleware("http")
+        async def timing(request: Request, call_next):
+            rid = str(uuid.uuid4())[:8]
+            start = time.time()
+            try:
+                resp = await call_next(request)
+                resp.headers["X-Request-Id"] = rid
+                resp.headers["X-Elapsed-Ms"] = str(int((time.time() - start) * 1000))
+                return resp
+            except Exception as e:  # noqa: BLE001
+                return JSONResponse({"ok": False, "error": str(e), "request_id": rid}, status_code=500)
+    elif variant == "asgi":
+        app.add_middleware(RequestContextMiddleware)
+    return app
+
+
+async def request(app, path: str, headers=()) -> int:
+    """One GET through the ASGI app; returns the number of body bytes received."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": list(headers), "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+    received = 0
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return received
+
+
+async def bench(app, size: int, downloads: int, json_requests: int) -> dict:
+    await request(app, "/audio/file.wav")  # warm the ETag cache and code paths
+    t0 = time.perf_counter()
+    for _ in range(downloads):
+        assert await request(app, "/audio/file.wav") == size
+    dl = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    rng = [(b"range", f"bytes=0-{size // 2}".encode())]
+    for _ in range(downloads):
+        await request(app, "/audio/file.wav", rng)
+    rg = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(json_requests):
+        await request(app, "/api/ping")
+    js = time.perf_counter() - t0
+    return {
+        "download_mb_s": size * downloads / dl / 1e6,
+        "range_ms": rg / downloads * 1000,
+        "json_us": js / json_requests * 1e6,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-mb", type=int, default=64)
+    ap.add_argument("--downloads", type=int, default=20)
+    ap.add_argument("--json", type=int, default=2000)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "file.wav"
+        path.write_bytes(os.urandom(args.size_mb * 1024 * 1024))
+        size = path.stat().st_size
+        print(f"{'variant':8s} {'download MB/s':>14s} {'range ms':>10s} {'json us/req':>12s}")
+        for variant in ("none", "base", "asgi"):
+            r = asyncio.run(bench(build_app(variant, path), size, args.downloads, args.json))
+            print(f"{variant:8s} {r['download_mb_s']:14.0f} {r['range_ms']:10.2f} {r['json_us']:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
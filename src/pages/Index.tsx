@@ -16,8 +16,25 @@ interface AudioRequest {
   filename: string;
   prompt: string;
   status: "queued" | "generating" | "complete" | "canceled" | "error";
+  progress?: number;
+  queuePosition?: number | null;
 }
 
+interface JobState {
+  job_id: string;
+  status: "queued" | "running" | "done" | "failed" | "canceled";
+  progress?: number;
+  queue_position?: number | null;
+  url?: string;
+  error?: string;
+}
+
+const toRequestStatus = (status: JobState["status"]): AudioRequest["status"] =>
+  status === "running" ? "generating" :
+  status === "done" ? "complete" :
+  status === "failed" ? "error" :
+  status;
+
 const Index = () => {
   const [generatedAudio, setGeneratedAudio] = useState<GeneratedAudio | null>(null);
   const [isLoading, setIsLoading] = useState(false);
@@ -69,78 +86,92 @@ const Index = () => {
     }
   };
 
-  // Poll status for all pending requests
+  // Follow pending jobs over server-sent events instead of polling /api/status
+  const eventSources = React.useRef<Map<string, EventSource>>(new Map());
+  const lastStatus = React.useRef<Map<string, string>>(new Map());
+
+  const handleJobState = React.useCallback((request: AudioRequest, data: JobState) => {
+    const id = request.filename;
+    const status = toRequestStatus(data.status);
+    if (lastStatus.current.get(id) !== data.status) {
+      logLine(`📊 Status update for ${id}: ${lastStatus.current.get(id) ?? request.status} → ${data.status}`);
+      lastStatus.current.set(id, data.status);
+    }
+
+    setAudioRequests(prev => prev.map(req =>
+      req.filename === id
+        ? { ...req, status, progress: data.progress, queuePosition: data.queue_position }
+        : req
+    ));
+
+    if (data.status === "done" || data.status === "failed" || data.status === "canceled") {
+      eventSources.current.get(id)?.close();
+      eventSources.current.delete(id);
+      lastStatus.current.delete(id);
+    }
+
+    if (data.status === "done" && data.url) {
+      setGeneratedAudio({
+        url: data.url,
+        filename: data.url.split('/').pop() || id
+      });
+
+      logLine(`✅ Audio generation completed successfully: ${id}`, 'INFO');
+
+      toast({
+        title: "Audio Generated Successfully!",
+        description: `Generated for: "${request.prompt.substring(0, 50)}..."`,
+      });
+    } else if (data.status === "failed") {
+      logLine(`❌ Audio generation failed: ${id}${data.error ? ` (${data.error})` : ''}`, 'ERROR');
+      logLine(`🔄 You can retry by clicking "Generate Audio" again`, 'INFO');
+
+      toast({
+        title: "Generation Failed",
+        description: `Failed to generate audio for: "${request.prompt.substring(0, 30)}...". Check console logs and try again.`,
+        variant: "destructive",
+      });
+    }
+  }, [toast]);
+
   React.useEffect(() => {
-    const interval = setInterval(async () => {
-      const pendingRequests = audioRequests.filter(req => 
-        req.status === "queued" || req.status === "generating"
-      );
-      
-      if (pendingRequests.length > 0) {
-        logLine(`⏳ Polling status for ${pendingRequests.length} pending requests`);
-      }
-      
-      for (const request of pendingRequests) {
-        try {
-          const response = await fetch(`/api/status/${request.filename}`);
-          if (response.ok) {
-            const statusData = await response.json();
-            
-            // Log status changes
-            if (statusData.status !== request.status) {
-              logLine(`📊 Status update for ${request.filename}: ${request.status} → ${statusData.status}`);
-            }
-            
-            setAudioRequests(prev => prev.map(req => 
-              req.filename === request.filename 
-                ? { ...req, status: statusData.status }
-                : req
-            ));
-            
-            // If complete, set as generated audio and show success
-            if (statusData.status === "complete" && statusData.file_exists) {
-              setGeneratedAudio({
-                url: statusData.file_url,
-                filename: request.filename
-              });
-              
-              logLine(`✅ Audio generation completed successfully: ${request.filename}`, 'INFO');
-              
-              toast({
-                title: "Audio Generated Successfully!",
-                description: `Generated for: "${request.prompt.substring(0, 50)}..."`,
-              });
-            } else if (statusData.status === "error") {
-              logLine(`❌ Audio generation failed: ${request.filename}`, 'ERROR');
-              logLine(`🔄 You can retry by clicking "Generate Audio" again`, 'INFO');
-              
-              toast({
-                title: "Generation Failed",
-                description: `Failed to generate audio for: "${request.prompt.substring(0, 30)}...". Check console logs and try again.`,
-                variant: "destructive",
-              });
-            }
-          }
-        } catch (error) {
-          logLine(`❌ Failed to poll status for ${request.filename}: ${error}`, 'ERROR');
-          console.error(`Failed to poll status for ${request.filename}:`, error);
+    const sources = eventSources.current;
+    for (const request of audioRequests) {
+      const pending = request.status === "queued" || request.status === "generating";
+      if (!pending || sources.has(request.filename)) continue;
+
+      logLine(`📡 Subscribing to job events for ${request.filename}`);
+      const es = new EventSource(`${API_BASE}/api/jobs/${request.filename}/events`);
+      sources.set(request.filename, es);
+      es.addEventListener('state', (ev) => {
+        handleJobState(request, JSON.parse((ev as MessageEvent).data) as JobState);
+      });
+      es.onerror = () => {
+        if (es.readyState === EventSource.CLOSED) {
+          logLine(`❌ Lost job event stream for ${request.filename}`, 'ERROR');
+          sources.delete(request.filename);
         }
-      }
-    }, 2000); // Poll every 2 seconds
-    
-    return () => clearInterval(interval);
-  }, [audioRequests, toast]);
+      };
+    }
+  }, [audioRequests, handleJobState]);
+
+  React.useEffect(() => () => {
+    eventSources.current.forEach(es => es.close());
+    eventSources.current.clear();
+  }, []);
 
   const handleCancelAudio = async (filename: string) => {
     try {
       logLine(`🚫 Attempting to cancel audio generation: ${filename}`);
       
-      const response = await fetch(`/api/cancel-audio/${filename}`, {
+      const response = await fetch(`${API_BASE}/api/jobs/${filename}/cancel`, {
         method: 'POST'
       });
       
       if (response.ok) {
         logLine(`✅ Audio generation canceled successfully: ${filename}`);
+        eventSources.current.get(filename)?.close();
+        eventSources.current.delete(filename);
         setAudioRequests(prev => prev.map(req => 
           req.filename === filename 
             ? { ...req, status: "canceled" }
@@ -171,8 +202,8 @@ const Index = () => {
     logLine(`⏱️ Duration: ${duration} seconds`);
 
     try {
-      // Call the FastAPI backend
-      const response = await fetch(`${API_BASE}/api/generate-audio`, {
+      // Queue the job; progress arrives over /api/jobs/{id}/events
+      const response = await fetch(`${API_BASE}/api/jobs`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -217,15 +248,15 @@ const Index = () => {
       if (reqId) {
         logLine(`🧾 Request ID: ${reqId}`);
       }
-      if (data?.ok && data?.url) {
-        setGeneratedAudio({
-          url: data.url,
-          filename: (data?.path && typeof data.path === 'string' ? data.path.split('/').pop() : '') || data.url.split('/').pop() || ''
-        });
-        toast({
-          title: 'Audio Ready',
-          description: 'Your audio has been generated.',
-        });
+      if (data?.job_id) {
+        logLine(`🧾 Job queued: ${data.job_id} (position ${data.queue_position ?? '?'})`);
+        setAudioRequests(prev => [...prev, {
+          filename: data.job_id,
+          prompt,
+          status: toRequestStatus(data.status),
+          progress: data.progress,
+          queuePosition: data.queue_position,
+        }]);
       } else {
         const msg = data?.detail || data?.error || 'Generation failed';
         throw new Error(msg);
@@ -358,8 +389,8 @@ const Index = () => {
                           request.status === 'canceled' ? 'text-gray-600' :
                           'text-red-600'
                         }`}>
-                          {request.status === 'queued' ? '⏳ Queued' :
-                           request.status === 'generating' ? '🎧 Generating...' :
+                          {request.status === 'queued' ? `⏳ Queued${request.queuePosition ? ` (#${request.queuePosition})` : ''}` :
+                           request.status === 'generating' ? `🎧 Generating... ${Math.round((request.progress ?? 0) * 100)}%` :
                            request.status === 'complete' ? '✅ Complete' :
                            request.status === 'canceled' ? '❌ Canceled' :
                            '⚠️ Error'}